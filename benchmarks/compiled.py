@@ -0,0 +1,59 @@
+"""compare compiled template plans with building and dumping templates
+
+    PYTHONPATH=. python benchmarks/compiled.py --clusters 20000
+"""
+import argparse
+import json
+import sys
+import time
+
+from oshinko_temaki import compiled
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+def make_configs(count):
+    return [configs.ClusterConfig(argparse.Namespace(
+                name="bench-{}".format(i), workers=i % 8 + 1,
+                image="quay.io/radanalyticsio/openshift-spark:2.4",
+                envs=["SPARK_LOG_LEVEL=WARN", "TEAM=bench"],
+                sparkconfigs=["spark.executor.memory=4g",
+                              "spark.executor.cores=2"]))
+            for i in range(count)]
+
+
+def timed(render, confs):
+    start = time.perf_counter()
+    for conf in confs:
+        render(conf)
+    return time.perf_counter() - start
+
+
+def measure(output, template_class, confs):
+    plan = compiled.get_plan(output)
+    templated = timed(lambda conf: template_class(conf).dumps(), confs)
+    planned = timed(plan.render, confs)
+    return {
+        "output": output,
+        "clusters": len(confs),
+        "template_s": templated,
+        "compiled_s": planned,
+        "speedup": templated / planned,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clusters", type=int, default=10000,
+                        help="number of documents to render per output type")
+    args = parser.parse_args()
+
+    confs = make_configs(args.clusters)
+    results = [measure("cr", templates.CRDTemplate, confs),
+               measure("cm", templates.CMTemplate, confs)]
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
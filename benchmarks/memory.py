@@ -0,0 +1,67 @@
+"""measure the memory held by a fleet of cluster descriptions
+
+reports the bytes held by ClusterConfig objects, by ClusterSpec tuples, by
+templates over those specs and by the rendered documents, which is what
+every template used to keep, using tracemalloc.
+
+    PYTHONPATH=. python benchmarks/memory.py --clusters 100000
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+def make_args(count):
+    return [argparse.Namespace(
+        name="bench-{}".format(i), workers=i % 8 + 1,
+        image="quay.io/radanalyticsio/openshift-spark:2.4",
+        envs=["SPARK_LOG_LEVEL=WARN", "TEAM=bench"],
+        sparkconfigs=["spark.executor.memory=4g", "spark.executor.cores=2"],
+        downloads=["http://test.test/data.csv::/tmp/"])
+        for i in range(count)]
+
+
+def held(build, args):
+    """return the bytes still allocated by what build returns"""
+    gc.collect()
+    tracemalloc.start()
+    fleet = build(args)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del fleet
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clusters", type=int, default=100000,
+                        help="number of clusters in the fleet")
+    args = parser.parse_args()
+
+    fleet_args = make_args(args.clusters)
+    results = {
+        "clusters": args.clusters,
+        "config_bytes": held(
+            lambda a: [configs.ClusterConfig(n) for n in a], fleet_args),
+        "spec_bytes": held(
+            lambda a: [configs.ClusterSpec.from_args(n) for n in a],
+            fleet_args),
+        "template_bytes": held(
+            lambda a: [templates.CRDTemplate(configs.ClusterSpec.from_args(n))
+                       for n in a], fleet_args),
+        "rendered_bytes": held(
+            lambda a: [templates.CRDTemplate(configs.ClusterSpec.from_args(n))
+                       ._data for n in a], fleet_args),
+    }
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
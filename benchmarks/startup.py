@@ -0,0 +1,105 @@
+"""measure the cold start cost of osht
+
+for each output type this reports the cumulative import time of the cli
+module as seen by python -X importtime, the in-process latency of the
+first render and the wall clock time of a whole osht process. results are
+printed as json, and a budget in milliseconds can be given to make the
+script fail when the median process time exceeds it.
+
+    python benchmarks/startup.py --runs 20 --budget 150
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+FIRST_RENDER = """
+import time
+start = time.perf_counter()
+from oshinko_temaki import cli
+imported = time.perf_counter()
+cli.main(["-n", "bench", "-o", "{output}"])
+rendered = time.perf_counter()
+import sys
+sys.stderr.write("{{}} {{}}\\n".format(imported - start, rendered - imported))
+"""
+
+
+def import_time(output):
+    """return the cumulative microseconds to import the cli and render"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         FIRST_RENDER.format(output=output)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # only top level imports, nested ones are already included
+        if not name.startswith("  ") and cumulative.strip().isdigit():
+            total += int(cumulative)
+    return total
+
+
+def first_render(output):
+    """return the seconds spent importing the cli and rendering once"""
+    proc = subprocess.run(
+        [sys.executable, "-c", FIRST_RENDER.format(output=output)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    imported, rendered = proc.stderr.split()
+    return float(imported), float(rendered)
+
+
+def process_time(output):
+    """return the wall clock seconds of a whole osht process"""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "oshinko_temaki.cli", "-n", "bench",
+         "-o", output], stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def measure(output, runs):
+    imports = [first_render(output) for _ in range(runs)]
+    processes = [process_time(output) for _ in range(runs)]
+    return {
+        "output": output,
+        "runs": runs,
+        "importtime_us": import_time(output),
+        "import_ms": statistics.median(i for i, _ in imports) * 1000,
+        "first_render_ms": statistics.median(r for _, r in imports) * 1000,
+        "process_ms": statistics.median(processes) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10,
+                        help="number of runs to take the median of")
+    parser.add_argument("--budget", type=float,
+                        help="fail if a median process time in milliseconds "
+                             "is over this budget")
+    args = parser.parse_args()
+
+    results = [measure(output, args.runs) for output in ("cr", "cm")]
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+    if args.budget is not None:
+        over = [r for r in results if r["process_ms"] > args.budget]
+        for result in over:
+            sys.stderr.write(
+                "{} output took {:.1f}ms, budget is {}ms\n".format(
+                    result["output"], result["process_ms"], args.budget))
+        if over:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
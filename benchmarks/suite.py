@@ -0,0 +1,163 @@
+"""benchmark suite for the render pipeline and the cli
+
+each benchmark reports the best time per call in seconds over a number
+of repeats. results are written as json, and a compare mode flags every
+benchmark that got slower than a stored baseline by more than a
+threshold.
+
+    PYTHONPATH=. python benchmarks/suite.py --output baseline.json
+    PYTHONPATH=. python benchmarks/suite.py --compare baseline.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import timeit
+
+import oshinko_temaki
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+from oshinko_temaki import validation
+
+
+ENTRY_COUNTS = (10, 100, 1000, 10000)
+
+
+def best(func, number, repeat):
+    """return the best seconds per call of func"""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def bench_config(repeat):
+    parms = argparse.Namespace(name="bench", workers=3, image="some/image",
+                               envs=["A=b"], sparkconfigs=["spark.x=1"])
+    return {
+        "config.ClusterConfig": best(
+            lambda: configs.ClusterConfig(parms), 10000, repeat),
+        "config.ClusterSpec": best(
+            lambda: configs.ClusterSpec.from_args(parms), 10000, repeat),
+    }
+
+
+def bench_parsing(repeat):
+    results = {}
+    for count in ENTRY_COUNTS:
+        envs = ["KEY_{}=value-{}".format(i, i) for i in range(count)]
+        sparkconfigs = ["spark.key.{}={}".format(i, i) for i in range(count)]
+        downloads = ["http://test.test/{}::/tmp/{}".format(i, i)
+                     for i in range(count)]
+        number = max(1, 10000 // count)
+        results["parse.entries.{}".format(count)] = best(
+            lambda: templates.CRDTemplate(configs.ClusterSpec.create(
+                envs=envs, sparkconfigs=sparkconfigs,
+                downloads=downloads)).render(), number, repeat)
+    return results
+
+
+def bench_serialize(repeat):
+    spec = configs.ClusterSpec.create(
+        name="bench", workers=3, image="some/image",
+        envs=["KEY_{}=value".format(i) for i in range(10)],
+        sparkconfigs=["spark.key.{}=1".format(i) for i in range(10)])
+    cm = templates.CMTemplate(spec)
+    crd = templates.CRDTemplate(spec)
+    return {
+        "serialize.cm.yaml": best(cm.dumps, 1000, repeat),
+        "serialize.crd.json": best(crd.dumps, 1000, repeat),
+    }
+
+
+def bench_validate(repeat):
+    definitions = [{"name": "bench-{}".format(i), "workers": 3,
+                    "envs": ["A=b"], "sparkconfigs": ["spark.x=1"]}
+                   for i in range(100)]
+    return {
+        "validate.cr.100": best(
+            lambda: validation.check_all(definitions, "cr"), 10, repeat),
+        "validate.cm.100": best(
+            lambda: validation.check_all(definitions, "cm"), 10, repeat),
+    }
+
+
+def bench_api(repeat):
+    definition = {"name": "bench", "workers": 3, "envs": ["A=b"],
+                  "sparkconfigs": ["spark.x=1"]}
+    return {
+        "api.render.dict": best(
+            lambda: oshinko_temaki.render(definition), 10000, repeat),
+        "api.render.data": best(
+            lambda: oshinko_temaki.render(definition, encoding=None),
+            10000, repeat),
+    }
+
+
+def bench_cli(repeat):
+    results = {}
+    for output in ("cr", "cm"):
+        command = [sys.executable, "-m", "oshinko_temaki.cli", "-n", "bench",
+                   "-o", output]
+        results["cli.{}".format(output)] = best(
+            lambda: subprocess.run(command, stdout=subprocess.DEVNULL,
+                                   check=True), 5, repeat)
+    return results
+
+
+BENCHMARKS = {
+    "config": bench_config,
+    "parse": bench_parsing,
+    "serialize": bench_serialize,
+    "validate": bench_validate,
+    "api": bench_api,
+    "cli": bench_cli,
+}
+
+
+def compare(results, baseline, threshold):
+    """return the benchmarks slower than the baseline by over threshold"""
+    regressions = {}
+    for name, seconds in results.items():
+        previous = baseline.get(name)
+        if previous and seconds > previous * (1 + threshold):
+            regressions[name] = {"baseline": previous, "current": seconds,
+                                 "change": seconds / previous - 1}
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", action="append",
+                        choices=sorted(BENCHMARKS),
+                        help="run only these groups, may be repeated")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of repeats to take the best of")
+    parser.add_argument("--output",
+                        help="write the results to this file")
+    parser.add_argument("--compare",
+                        help="baseline results file to check against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown before a regression is "
+                             "flagged, default is 0.2 (20%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.only or sorted(BENCHMARKS):
+        results.update(BENCHMARKS[name](args.repeat))
+
+    report = {"python": sys.version.split()[0], "results": results}
+    if args.compare is not None:
+        with open(args.compare) as infile:
+            baseline = json.load(infile)["results"]
+        report["regressions"] = compare(results, baseline, args.threshold)
+
+    if args.output is not None:
+        with open(args.output, "w") as outfile:
+            json.dump(report, outfile, indent=2, sort_keys=True)
+    json.dump(report, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write("\n")
+
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""hand rolled spark clusters for openshift"""
+
+
+# the public names are imported when they are first used, importing the
+# package alone stays cheap for the osht client, which only needs the
+# templates when no render daemon is running
+_LAZY = {
+    "render": "api",
+    "render_async": "api",
+    "render_many": "api",
+    "render_many_async": "api",
+    "ClusterSpec": "configs",
+}
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(
+            "module {} has no attribute {}".format(__name__, name))
+    import importlib
+
+    value = getattr(importlib.import_module("." + module, __name__), name)
+    # later lookups find the name directly on the package
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
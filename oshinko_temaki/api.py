@@ -0,0 +1,92 @@
+"""rendering clusters from python without the cli
+
+the functions here take a ClusterSpec, a dict of cluster fields or the
+fields as keyword arguments. json documents come from the compiled plans
+and every plan and serializer is set up once per process, so a render
+only costs the work on the cluster itself.
+"""
+import types
+
+from oshinko_temaki import compiled
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+TEMPLATES = {
+    "cr": templates.CRDTemplate,
+    "cm": templates.CMTemplate,
+}
+
+
+def _spec(spec, fields):
+    if isinstance(spec, configs.ClusterSpec):
+        if fields:
+            raise ValueError("fields cannot be combined with a ClusterSpec")
+        return spec
+    if spec is None:
+        return configs.ClusterSpec.from_dict(fields)
+    if not isinstance(spec, dict):
+        raise ValueError(
+            "expected a ClusterSpec or a dict, got {!r}".format(spec))
+    return configs.ClusterSpec.from_dict({**fields, **spec})
+
+
+def render(spec=None, output="cr", encoding="json", **fields):
+    """render a cluster into a serialized document
+
+    spec is a ClusterSpec or a dict of cluster fields, the fields can also
+    be given as keyword arguments and are used as defaults for a dict.
+    output is "cr" or "cm", with an encoding of None the document is
+    returned as plain data instead.
+    """
+    spec = _spec(spec, fields)
+    if output not in TEMPLATES:
+        raise ValueError("unknown output type {}".format(output))
+    if encoding in compiled.SEPARATORS:
+        return compiled.get_plan(output, encoding).render(spec)
+    template = TEMPLATES[output](spec)
+    if encoding is None:
+        return template.render()
+    return template.dumps(encoding)
+
+
+def render_many(specs, output="cr", encoding="json", **defaults):
+    """generate a document for every spec or dict of an iterable, lazily
+
+    the keyword arguments are defaults for the fields of every dict.
+    """
+    for spec in specs:
+        yield render(spec, output, encoding,
+                     **({} if isinstance(spec, configs.ClusterSpec)
+                        else defaults))
+
+
+@types.coroutine
+def _pass():
+    # a bare yield hands control back to the event loop, the same way
+    # asyncio.sleep(0) does, without importing asyncio
+    yield
+
+
+async def render_async(spec=None, output="cr", encoding="json", **fields):
+    """render a cluster from a coroutine, see render
+
+    rendering does not wait on anything, this yields to the event loop
+    once before rendering so other tasks get a turn.
+    """
+    await _pass()
+    return render(spec, output, encoding, **fields)
+
+
+async def render_many_async(specs, output="cr", encoding="json", every=64,
+                            **defaults):
+    """asynchronously generate the documents of render_many
+
+    control goes back to the event loop after every few documents, so a
+    large batch does not hold up the other tasks of the loop.
+    """
+    for count, document in enumerate(
+            render_many(specs, output, encoding, **defaults), 1):
+        yield document
+        if count % every == 0:
+            await _pass()
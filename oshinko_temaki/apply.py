@@ -0,0 +1,192 @@
+"""submit rendered documents directly to a kubernetes api server"""
+import collections
+import http.client
+import json
+import ssl
+import threading
+import time
+import urllib.parse
+from concurrent import futures
+
+from oshinko_temaki import serializers
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+FIELD_MANAGER = "osht"
+
+# the api paths for the kinds of document that osht renders
+PATHS = {
+    "SparkCluster": "/apis/radanalytics.io/v1/namespaces/{namespace}"
+                    "/sparkclusters/{name}",
+    "ConfigMap": "/api/v1/namespaces/{namespace}/configmaps/{name}",
+}
+
+
+ApplyResult = collections.namedtuple(
+    "ApplyResult", "kind name status attempts latency error")
+
+
+def parse_document(document):
+    """return the kind and name of a serialized document"""
+    try:
+        data = json.loads(document)
+    except ValueError:
+        data = serializers.load_yaml(document)
+    return data["kind"], data["metadata"]["name"]
+
+
+class Submitter():
+    """apply documents with server side apply over pooled connections
+
+    every worker thread keeps its own keep-alive connection to the server.
+    requests answered with 429 or a 5xx status, or failing to connect, are
+    retried with exponential backoff, honouring a Retry-After header.
+    fields owned by other managers, such as the operator, are only taken
+    over when force is set, otherwise the conflict is reported.
+    """
+    def __init__(self, server, namespace="default", token=None,
+                 concurrency=4, retries=5, backoff=0.5, timeout=30,
+                 insecure=False, ca_file=None, force=False):
+        url = urllib.parse.urlsplit(server)
+        if url.scheme not in ("http", "https"):
+            raise ValueError("unsupported server url {}".format(server))
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip("/")
+        self.namespace = namespace
+        self.token = token
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.force = force
+        self.context = None
+        if self.scheme == "https":
+            self.context = ssl.create_default_context(cafile=ca_file)
+            if insecure:
+                self.context.check_hostname = False
+                self.context.verify_mode = ssl.CERT_NONE
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    self.host, self.port, timeout=self.timeout,
+                    context=self.context)
+            else:
+                conn = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def path(self, kind, name):
+        """return the api path and query for applying a document"""
+        try:
+            template = PATHS[kind]
+        except KeyError:
+            raise ValueError("cannot apply documents of kind {}".format(kind))
+        path = template.format(namespace=urllib.parse.quote(self.namespace),
+                               name=urllib.parse.quote(name))
+        query = "fieldManager={}".format(FIELD_MANAGER)
+        if self.force:
+            query += "&force=true"
+        return "{}{}?{}".format(self.prefix, path, query)
+
+    def submit(self, document):
+        """apply a single serialized document, returning an ApplyResult"""
+        kind, name = parse_document(document)
+        path = self.path(kind, name)
+        body = document.encode("utf-8")
+        headers = {
+            "Content-Type": "application/apply-patch+yaml",
+            "Accept": "application/json",
+        }
+        if self.token:
+            headers["Authorization"] = "Bearer {}".format(self.token)
+
+        start = time.perf_counter()
+        status = None
+        error = None
+        attempt = 0
+        while True:
+            attempt += 1
+            delay = self.backoff * 2 ** (attempt - 1)
+            try:
+                conn = self._connection()
+                conn.request("PATCH", path, body, headers)
+                response = conn.getresponse()
+                payload = response.read()
+                status = response.status
+                if response.will_close:
+                    self._reset()
+            except (OSError, http.client.HTTPException) as exc:
+                self._reset()
+                status = None
+                error = str(exc)
+            else:
+                if status < 400:
+                    error = None
+                    break
+                error = payload.decode("utf-8", "replace")[:200]
+                if status == 409:
+                    error = ("conflicts with fields of another manager, "
+                             "--force-conflicts takes them over: " + error)
+                if status not in RETRY_STATUSES:
+                    break
+                retry_after = response.getheader("Retry-After")
+                if retry_after is not None and retry_after.isdigit():
+                    delay = int(retry_after)
+
+            if attempt > self.retries:
+                break
+            time.sleep(delay)
+
+        return ApplyResult(kind, name, status, attempt,
+                           time.perf_counter() - start, error)
+
+    def apply(self, documents):
+        """apply every document, yielding the results in input order
+
+        at most concurrency requests are in flight and only a small window
+        of documents is held, so any number of documents can be streamed.
+        """
+        window = collections.deque()
+        with futures.ThreadPoolExecutor(self.concurrency) as executor:
+            for document in documents:
+                window.append(executor.submit(self.submit, document))
+                if len(window) >= self.concurrency * 2:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+
+
+def summarize(results):
+    """return the counts and latency percentiles for a list of results"""
+    latencies = sorted(result.latency for result in results)
+    failed = [result for result in results if result.error is not None]
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * fraction))
+        return latencies[index] * 1000
+
+    return {
+        "applied": len(results) - len(failed),
+        "failed": len(failed),
+        "retries": sum(result.attempts - 1 for result in results),
+        "latency_ms": {
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": latencies[-1] * 1000 if latencies else None,
+        },
+    }
@@ -0,0 +1,248 @@
+"""render many clusters from a single manifest file"""
+import collections
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+from oshinko_temaki import cache
+from oshinko_temaki import compiled
+from oshinko_temaki import configs
+from oshinko_temaki import outdir
+from oshinko_temaki import serializers
+from oshinko_temaki import templates
+from oshinko_temaki import validation
+from oshinko_temaki import writers
+
+
+# separator for the list fields when they are packed into a single csv cell
+CSV_LIST_SEPARATOR = ";"
+
+
+def load_manifest(path):
+    """read a list of cluster definitions from a yaml, json or csv file
+
+    a path of "-" will read from standard input, which is parsed as yaml
+    (and therefore also accepts json). yaml and json manifests can either
+    be a list of definitions or a mapping with a "clusters" list.
+    """
+    if path == "-":
+        return _load_structured(sys.stdin, "yaml")
+
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="") as infile:
+        if ext == ".csv":
+            return _load_csv(infile)
+        if ext == ".json":
+            return _load_structured(infile, "json")
+        return _load_structured(infile, "yaml")
+
+
+def _load_structured(infile, kind):
+    if kind == "json":
+        raw = json.load(infile)
+    else:
+        raw = serializers.load_yaml(infile)
+
+    if isinstance(raw, dict):
+        raw = raw.get("clusters")
+    if not isinstance(raw, list):
+        raise ValueError("a manifest must contain a list of clusters")
+    return _normalize_all(raw)
+
+
+def _normalize_all(raw):
+    # every bad definition is reported together, like the schema errors
+    definitions = []
+    problems = []
+    for index, definition in enumerate(raw):
+        try:
+            definitions.append(configs.normalize_definition(definition))
+        except ValueError as exc:
+            name = (definition.get("name")
+                    if isinstance(definition, dict) else None)
+            label = "cluster {}".format(index if name is None else name)
+            problems.append((label, "", str(exc)))
+    if problems:
+        raise validation.ValidationError(problems)
+    return definitions
+
+
+def _load_csv(infile):
+    definitions = []
+    for row in csv.DictReader(infile):
+        definition = {}
+        for key, value in row.items():
+            if value is None or value == "":
+                continue
+            if key in configs.LIST_FIELDS:
+                value = [v for v in value.split(CSV_LIST_SEPARATOR) if v]
+            definition[key] = value
+        definitions.append(definition)
+    return _normalize_all(definitions)
+
+
+def render_definition(definition, output="cr", encoding="json", cache=None,
+                      precompiled=False):
+    """render a single cluster definition into a serialized document
+
+    if a RenderCache is given it is used to look up the template, with
+    precompiled the document is produced by a compiled plan instead.
+    """
+    conf = configs.ClusterSpec.from_dict(definition)
+    if precompiled:
+        return compiled.get_plan(output, encoding).render(conf)
+    template_class = (templates.CRDTemplate if output == "cr"
+                      else templates.CMTemplate)
+    if cache is None:
+        return template_class(conf).dumps(encoding)
+    return cache.render(template_class, conf).dumps(encoding)
+
+
+# each pool worker keeps its own in-memory cache
+_worker_cache = None
+
+
+def _init_worker(cache_size, cache_policy):
+    global _worker_cache
+    if cache_size:
+        _worker_cache = cache.RenderCache(cache_size, cache_policy)
+
+
+def _render_job(job):
+    definition, output, encoding, precompiled = job
+    return render_definition(definition, output, encoding, _worker_cache,
+                             precompiled)
+
+
+def render_all(definitions, output="cr", processes=None, chunksize=16,
+               encoding="json", cache=None, precompiled=False):
+    """generate the serialized documents for all definitions, in order
+
+    when processes is greater than 1 the rendering is spread over a
+    process pool, otherwise everything happens in the current process.
+    with a pool every worker gets a private cache of the same size and
+    policy as the one given, without persistence. definitions are handed
+    to the pool a window at a time, so a generator is never drained
+    ahead of the output.
+    """
+    if not processes or processes < 2:
+        for definition in definitions:
+            yield render_definition(definition, output, encoding, cache,
+                                    precompiled)
+        return
+
+    initargs = (0, None) if cache is None else (cache.maxsize, cache.policy)
+    jobs = ((definition, output, encoding, precompiled)
+            for definition in definitions)
+    window = processes * chunksize * 4
+    with multiprocessing.Pool(processes, _init_worker, initargs) as pool:
+        while True:
+            # imap would otherwise queue every job of the generator at once
+            batch = list(itertools.islice(jobs, window))
+            if not batch:
+                break
+            for document in pool.imap(_render_job, batch, chunksize):
+                yield document
+
+
+def manifest_stem(path):
+    """return the name prefix for the unnamed clusters of a manifest
+
+    this is the file name without its extension, made into a valid
+    cluster name, or "spark" for standard input.
+    """
+    stem = "" if path == "-" else os.path.splitext(os.path.basename(path))[0]
+    stem = re.sub(r"[^a-z0-9]+", "-", stem.lower()).strip("-")[:40]
+    return stem.rstrip("-") or "spark"
+
+
+def prepare(path, defaults, stable_names=False, validate=None):
+    """load a manifest and fill in the defaults of every definition
+
+    with stable_names the definitions without a name are named after the
+    manifest and their position in it, "<stem>-<index>", instead of
+    randomly. such a name survives edits of the cluster and of the
+    defaults, moving the cluster in the manifest renames it. validate can
+    be set to "cr" or "cm" to check every definition against the schema
+    of that output first, all of the errors are raised together as a
+    ValidationError.
+    """
+    definitions = [{**defaults, **definition}
+                   for definition in load_manifest(path)]
+    if stable_names:
+        stem = manifest_stem(path)
+        for index, definition in enumerate(definitions):
+            if "name" not in definition:
+                definition["name"] = "{}-{}".format(stem, index)
+    if validate is not None:
+        validation.check_all(definitions, validate)
+    return definitions
+
+
+def run(path, defaults, output="cr", processes=None, stream=None,
+        fmt="yaml", encoding="json", cache=None, precompiled=False,
+        stable_names=False, validate=False):
+    """render every cluster in a manifest as a multi-document stream
+
+    values in defaults are used for any fields a definition leaves out,
+    with validate nothing is written unless every cluster is valid.
+    returns the number of documents written.
+    """
+    definitions = prepare(path, defaults, stable_names,
+                          output if validate else None)
+    return write_stream(definitions, output, processes, stream, fmt,
+                        encoding, cache, precompiled)
+
+
+def write_stream(definitions, output="cr", processes=None, stream=None,
+                 fmt="yaml", encoding="json", cache=None, precompiled=False):
+    """render cluster definitions as a multi-document stream
+
+    returns the number of documents written.
+    """
+    stream = stream or sys.stdout
+    return writers.write_documents(
+        render_all(definitions, output, processes, encoding=encoding,
+                   cache=cache, precompiled=precompiled),
+        stream, fmt)
+
+
+def sync(path, defaults, output_dir, output="cr", processes=None,
+         encoding="json", cache=None, precompiled=False, validate=False):
+    """render every cluster in a manifest into one file per cluster
+
+    unnamed clusters get stable names, only files whose content changed
+    are written and files of clusters no longer in the manifest are
+    removed. returns the report of the OutputDirectory.
+    """
+    definitions = prepare(path, defaults, True, output if validate else None)
+    return write_directory(definitions, output_dir, output, processes,
+                           encoding, cache, precompiled)
+
+
+def write_directory(definitions, output_dir, output="cr", processes=None,
+                    encoding="json", cache=None, precompiled=False):
+    """render named cluster definitions into one file per cluster
+
+    definitions can be a generator, it is only iterated once. returns the
+    report of the OutputDirectory.
+    """
+    # the names of the definitions handed to render_all and not written yet
+    names = collections.deque()
+
+    def named(definitions):
+        for definition in definitions:
+            names.append(definition["name"])
+            yield definition
+
+    documents = render_all(named(definitions), output, processes,
+                           encoding=encoding, cache=cache,
+                           precompiled=precompiled)
+    with outdir.OutputDirectory(output_dir, encoding) as directory:
+        for document in documents:
+            directory.write(names.popleft(), document)
+    return directory.report()
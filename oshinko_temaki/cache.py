@@ -0,0 +1,110 @@
+"""a memoizing cache for rendered templates"""
+import collections
+import hashlib
+import json
+import os
+
+from oshinko_temaki import configs
+
+
+POLICIES = ("lru", "fifo")
+CACHE_VERSION = 3
+
+
+def config_key(template_class, spec):
+    """return a canonical hash for rendering a spec with a template
+
+    the name is left out, the parsed entries serialize as nested lists.
+    """
+    canonical = json.dumps([template_class.__name__, spec[1:]],
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _with_name(data, name):
+    metadata = dict(data["metadata"], name=name)
+    return dict(data, metadata=metadata)
+
+
+class RenderCache():
+    """keep rendered template data keyed by the normalized config
+
+    only the cluster name differs between configs with the same key, so a
+    hit just copies the top level of the cached data with the new name.
+    policy is either "lru", which refreshes entries when they are used, or
+    "fifo", which evicts in insertion order. if a path is given the
+    entries can be loaded from and saved to that file.
+    """
+    def __init__(self, maxsize=1024, policy="lru", path=None):
+        if policy not in POLICIES:
+            raise ValueError("unknown cache policy {}".format(policy))
+        self.maxsize = maxsize
+        self.policy = policy
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def render(self, template_class, config):
+        """return a template for the config, rendering it only on a miss"""
+        spec = configs.ClusterSpec.from_args(config)
+        key = config_key(template_class, spec)
+        data = self._entries.get(key)
+        if data is not None:
+            self.hits += 1
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            return template_class.from_data(_with_name(data, spec.name), spec)
+
+        self.misses += 1
+        data = template_class(spec).render()
+        self._store(key, data)
+        return template_class.from_data(data, spec)
+
+    def _store(self, key, data):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = data
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """return the cache counters as a dict"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+        }
+
+    def load(self):
+        """read the entries from the cache file, ignoring stale versions
+
+        a file that cannot be read as a cache is ignored the same way, the
+        cache starts empty and the file is replaced on the next save.
+        """
+        try:
+            with open(self.path) as infile:
+                saved = json.load(infile)
+            if saved.get("version") != CACHE_VERSION:
+                return
+            for key, data in saved["entries"]:
+                self._store(key, data)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self._entries.clear()
+
+    def save(self):
+        """write the entries to the cache file"""
+        tmp = "{}.tmp".format(self.path)
+        with open(tmp, "w") as outfile:
+            json.dump({"version": CACHE_VERSION,
+                       "entries": list(self._entries.items())}, outfile)
+        os.replace(tmp, self.path)
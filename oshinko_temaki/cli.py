@@ -1,11 +1,31 @@
-import argparse
+import time
+_import_start = time.perf_counter()
 
-from oshinko_temaki import configs
-from oshinko_temaki import templates
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import sys  # noqa: E402
 
+from oshinko_temaki import configs  # noqa: E402
+from oshinko_temaki import instrument  # noqa: E402
+from oshinko_temaki import serializers  # noqa: E402
+from oshinko_temaki import templates  # noqa: E402
+from oshinko_temaki import validation  # noqa: E402
+from oshinko_temaki import writers  # noqa: E402
+
+# how long the imports of the cli took, reported with --timings
+_import_seconds = time.perf_counter() - _import_start
+
+
+_parser = None
+
+
+def build_parser():
+    """create the argument parser, it is built once and then reused"""
+    global _parser
+    if _parser is not None:
+        return _parser
 
-def main():
-    """main entry point for the cli tool"""
     parser = argparse.ArgumentParser(description="create spark cluster configs")
     parser.add_argument("-n", "--name",
                         dest="name",
@@ -42,26 +62,582 @@ def main():
                         action="append",
                         help="add a spark configuration variable to the "
                              "cluster, example --sparkconfig KEY=VALUE")
+    parser.add_argument("--sparkconfig-file",
+                        dest="sparkconfig_files",
+                        action="append",
+                        help="read spark configuration variables from a "
+                             "spark-defaults.conf file, may be repeated. "
+                             "later files and --sparkconfig values win for "
+                             "the same key")
+    parser.add_argument("--env-file",
+                        dest="env_files",
+                        action="append",
+                        help="read environment variables from a dotenv "
+                             "file, may be repeated. later files and --env "
+                             "values win for the same name")
     parser.add_argument("-d", "--download",
                         dest="downloads",
                         action="append",
                         help="add a URL and directory to download data, "
                              "example --download URL::DIR")
+    parser.add_argument("-l", "--label",
+                        dest="labels",
+                        action="append",
+                        help="add a label to the cluster documents, "
+                             "example --label KEY=VALUE")
+    parser.add_argument("--annotation",
+                        dest="annotations",
+                        action="append",
+                        help="add an annotation to the cluster documents, "
+                             "example --annotation KEY=VALUE")
     parser.add_argument("-o", "--output",
                         dest="output",
                         choices=["cr", "cm"],
                         default="cr",
                         help="specify the output type, custom resource (cr) "
                              "or ConfigMap (cm). default is cr")
+    parser.add_argument("-f", "--file",
+                        dest="file",
+                        help="render every cluster defined in a yaml, json "
+                             "or csv manifest file, use - to read standard "
+                             "input. other options are used as defaults for "
+                             "the clusters in the manifest")
+    parser.add_argument("-p", "--processes",
+                        dest="processes",
+                        help="number of processes to render a manifest "
+                             "file with, default is to render in-process",
+                        type=int)
+    parser.add_argument("--format",
+                        dest="format",
+                        choices=sorted(writers.WRITERS),
+                        help="write the documents as a --- separated yaml "
+                             "stream, newline delimited json or a "
+                             "kubernetes List. default is yaml for manifest "
+                             "files and a single document otherwise")
+    parser.add_argument("--encoding",
+                        dest="encoding",
+                        choices=sorted(serializers.SERIALIZERS),
+                        default="json",
+                        help="serialize each document as json, compact "
+                             "json or yaml. default is json")
+    parser.add_argument("--cache-size",
+                        dest="cache_size",
+                        help="keep up to this many rendered cluster shapes "
+                             "in a cache, clusters that differ only by name "
+                             "are then rendered once",
+                        type=int)
+    parser.add_argument("--cache-policy",
+                        dest="cache_policy",
+                        choices=["lru", "fifo"],
+                        default="lru",
+                        help="eviction policy for the render cache, "
+                             "default is lru")
+    parser.add_argument("--cache-file",
+                        dest="cache_file",
+                        help="load the render cache from this file and save "
+                             "it back when done")
+    parser.add_argument("--cache-stats",
+                        dest="cache_stats",
+                        help="print the render cache counters as json to "
+                             "standard error",
+                        action="store_true")
+    parser.add_argument("--compiled",
+                        dest="compiled",
+                        help="render json documents with precompiled "
+                             "template plans, this is faster for large "
+                             "manifests and produces identical output",
+                        action="store_true")
+    parser.add_argument("--stable-names",
+                        dest="stable_names",
+                        help="name the unnamed clusters of a manifest after "
+                             "the manifest file and their position in it "
+                             "instead of randomly",
+                        action="store_true")
+    parser.add_argument("--sweep",
+                        dest="sweeps",
+                        action="append",
+                        help="render a cluster for every combination of "
+                             "values, example --sweep workers=2..8:2 or "
+                             "--sweep spark.executor.memory=2g,4g. the "
+                             "parameter is masters, workers, image or a "
+                             "spark configuration key, -n names the sweep")
+    parser.add_argument("--sweep-sample",
+                        dest="sweep_sample",
+                        help="render only this many randomly picked "
+                             "combinations of the sweep",
+                        type=int)
+    parser.add_argument("--sweep-seed",
+                        dest="sweep_seed",
+                        help="seed for picking the sampled combinations, "
+                             "default is 0",
+                        type=int,
+                        default=0)
+    parser.add_argument("--convert",
+                        dest="convert",
+                        help="convert the clusters of a yaml stream, such as "
+                             "the output of oc get cm -o yaml, to the other "
+                             "format. ConfigMaps become custom resources and "
+                             "custom resources become ConfigMaps. use - to "
+                             "read standard input")
+    parser.add_argument("--output-dir",
+                        dest="output_dir",
+                        help="write each cluster of a manifest to its own "
+                             "file in this directory, only changed files "
+                             "are rewritten and a report of the added, "
+                             "changed and removed clusters is printed to "
+                             "standard error")
+    parser.add_argument("--apply",
+                        dest="apply",
+                        metavar="SERVER",
+                        help="apply the documents directly to the api "
+                             "server at this url instead of printing them")
+    parser.add_argument("--namespace",
+                        dest="namespace",
+                        default="default",
+                        help="namespace to apply the documents in, "
+                             "default is default")
+    parser.add_argument("--token-file",
+                        dest="token_file",
+                        help="file holding the bearer token for the api "
+                             "server, default is the OSHT_TOKEN environment "
+                             "variable")
+    parser.add_argument("--ca-file",
+                        dest="ca_file",
+                        help="certificate authority bundle for the api "
+                             "server")
+    parser.add_argument("--insecure",
+                        dest="insecure",
+                        help="do not verify the api server certificate",
+                        action="store_true")
+    parser.add_argument("--force-conflicts",
+                        dest="force_conflicts",
+                        help="when applying, take over fields owned by "
+                             "other managers instead of failing on the "
+                             "conflict",
+                        action="store_true")
+    parser.add_argument("--concurrency",
+                        dest="concurrency",
+                        default=4,
+                        help="number of concurrent api requests when "
+                             "applying, default is 4",
+                        type=int)
+    parser.add_argument("--size-node-cpus",
+                        dest="size_node_cpus",
+                        help="size the cluster for nodes with this many "
+                             "cpus, requires --size-node-memory",
+                        type=int)
+    parser.add_argument("--size-node-memory",
+                        dest="size_node_memory",
+                        help="size the cluster for nodes with this much "
+                             "memory, example 16g")
+    parser.add_argument("--size-input",
+                        dest="size_input",
+                        help="expected size of the input data when sizing, "
+                             "example 500g")
+    parser.add_argument("--size-parallelism",
+                        dest="size_parallelism",
+                        help="number of tasks to run at the same time "
+                             "when sizing",
+                        type=int)
+    parser.add_argument("--profile",
+                        dest="profile",
+                        help="expand a named bundle of spark settings into "
+                             "the spark configuration, one of throughput, "
+                             "latency, memory-lean, a profile in the "
+                             "profile directory or a yaml file. "
+                             "--sparkconfig values take precedence")
+    parser.add_argument("--profile-dir",
+                        dest="profile_dir",
+                        default=os.environ.get("OSHT_PROFILE_DIR"),
+                        help="directory of shared yaml profiles, default is "
+                             "the OSHT_PROFILE_DIR environment variable")
+    parser.add_argument("--show-sparkconfig",
+                        dest="show_sparkconfig",
+                        help="print the merged spark configuration to "
+                             "standard error",
+                        action="store_true")
+    for role in configs.ROLES:
+        for resource, kind in (("cpu", "cpu"), ("memory", "memory")):
+            for bound in ("request", "limit"):
+                parser.add_argument(
+                    "--{}-{}-{}".format(role, resource, bound),
+                    dest="{}_{}_{}".format(role, resource, bound),
+                    help="{} {} for each {} pod".format(kind, bound, role))
+    parser.add_argument("--scratch",
+                        dest="scratch",
+                        choices=configs.SCRATCH_KINDS,
+                        help="give every worker a scratch volume for "
+                             "shuffle and spill files, in memory, on the "
+                             "node disk or on a persistent volume claim")
+    parser.add_argument("--scratch-size",
+                        dest="scratch_size",
+                        help="size of the scratch volume, required for "
+                             "memory and pvc. memory scratch counts against "
+                             "the worker memory")
+    parser.add_argument("--worker-volumes",
+                        dest="worker_volumes",
+                        help="the spark operator mounts the volumes and "
+                             "volumeMounts of the worker role, --scratch "
+                             "requires it",
+                        action="store_true")
+    parser.add_argument("--timings",
+                        dest="timings",
+                        help="print the duration of each stage and the "
+                             "document sizes as json to standard error",
+                        action="store_true")
+    parser.add_argument("--profile-out",
+                        dest="profile_out",
+                        help="write cProfile statistics for the run to this "
+                             "file, they can be read with pstats")
+    parser.add_argument("--validate",
+                        dest="validate",
+                        help="check every cluster against the SparkCluster "
+                             "schema before anything is written, all of the "
+                             "errors are reported together",
+                        action="store_true")
+    parser.add_argument("--output-file",
+                        dest="output_file",
+                        help="write the documents to a file instead of "
+                             "standard output")
+
+    _parser = parser
+    return parser
+
+
+def main(argv=None):
+    """main entry point for the cli tool"""
+    start = time.perf_counter()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    parsed = time.perf_counter() - start
+
+    timings = None
+    if args.timings:
+        timings = instrument.Timings()
+        instrument.add_hook(timings)
+        instrument.record("import", _import_seconds)
+        instrument.record("argparse", parsed)
+
+    try:
+        if args.profile_out is not None:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            try:
+                profiler.runcall(run, parser, args)
+            finally:
+                profiler.dump_stats(args.profile_out)
+        else:
+            run(parser, args)
+    finally:
+        if timings is not None:
+            instrument.remove_hook(timings)
+            sys.stderr.write(json.dumps(timings.summary()))
+            sys.stderr.write("\n")
+
+
+def run(parser, args):
+    """render, write or apply the clusters for parsed arguments"""
+    if args.encoding == "yaml" and args.format in ("ndjson", "list"):
+        parser.error("the {} format requires a json encoding".format(
+            args.format))
+    if args.compiled and args.encoding == "yaml":
+        parser.error("compiled templates require a json encoding")
+    if args.sweeps and args.file is not None:
+        parser.error("use either a manifest file or a sweep")
+    if args.output_dir is not None and args.file is None and not args.sweeps:
+        parser.error("an output directory requires a manifest file or a "
+                     "sweep")
+    if args.output_dir is not None and args.output_file is not None:
+        parser.error("use either an output directory or an output file")
+    if args.convert is not None and (
+            args.file is not None or args.sweeps or args.apply is not None or
+            args.output_dir is not None):
+        parser.error("--convert cannot be combined with a manifest, a sweep, "
+                     "--apply or --output-dir")
+    if args.compiled and (args.cache_size or args.cache_file is not None):
+        parser.error("compiled templates cannot be used with the cache")
+
+    if args.sparkconfig_files or args.env_files:
+        from oshinko_temaki import pairfiles
+
+        for field, paths in (("sparkconfigs", args.sparkconfig_files),
+                             ("envs", args.env_files)):
+            if not paths:
+                continue
+            try:
+                setattr(args, field, configs.merge_pairs(
+                    pairfiles.read_files(field, paths), getattr(args, field)))
+            except (OSError, ValueError) as exc:
+                parser.error(str(exc))
+
+    if args.size_node_cpus is not None or args.size_node_memory is not None:
+        if args.size_node_cpus is None or args.size_node_memory is None:
+            parser.error("sizing requires both --size-node-cpus and "
+                         "--size-node-memory")
+        try:
+            apply_sizing(args)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if args.profile is not None:
+        from oshinko_temaki import profiles
+
+        try:
+            expanded = profiles.expand(args.profile, args.profile_dir)
+        except (OSError, ValueError) as exc:
+            parser.error(str(exc))
+        args.sparkconfigs = configs.merge_pairs(expanded, args.sparkconfigs)
+
+    if args.show_sparkconfig:
+        for item in args.sparkconfigs or ():
+            sys.stderr.write("{}\n".format(item))
+
+    if args.convert is not None:
+        try:
+            convert_documents(args)
+        except (OSError, ValueError) as exc:
+            parser.error(str(exc))
+        return
+
+    render_cache = None
+    if args.cache_size or args.cache_file is not None:
+        from oshinko_temaki import cache
+
+        render_cache = cache.RenderCache(
+            1024 if args.cache_size is None else args.cache_size,
+            args.cache_policy, args.cache_file)
+
+    applied = True
+    try:
+        if args.validate and args.file is None and not args.sweeps:
+            definition = batch_defaults(args)
+            if args.name is not None:
+                definition["name"] = args.name
+            validation.check_all([definition], args.output)
+        if args.apply is not None:
+            applied = apply_documents(args, render_cache)
+        else:
+            write_documents(args, render_cache)
+    except validation.ValidationError as exc:
+        # every problem is reported, without the usage
+        sys.stderr.write("{}\n".format(exc))
+        sys.exit(1)
+    except ValueError as exc:
+        parser.error(str(exc))
 
-    args = parser.parse_args()
-    conf = configs.ClusterConfig(args)
+    if render_cache is not None:
+        if render_cache.path is not None:
+            render_cache.save()
+        if args.cache_stats:
+            sys.stderr.write(json.dumps(render_cache.stats()))
+            sys.stderr.write("\n")
+
+    if not applied:
+        sys.exit(1)
+
+
+def apply_sizing(args):
+    """fill in the workers and executor configs from the sizing options
+
+    the arithmetic is explained on standard error, explicit --workers and
+    --sparkconfig values take precedence over the computed ones. explicit
+    executor cores, memory and overhead are sized around, so the rest
+    stays consistent with them.
+    """
+    from oshinko_temaki import sizing
+
+    explicit = dict(item.split("=", 1) for item in args.sparkconfigs or ()
+                    if "=" in item)
+    cores = explicit.get("spark.executor.cores")
+    result = sizing.size_cluster(
+        args.size_node_cpus, args.size_node_memory, args.size_input,
+        args.size_parallelism, None if cores is None else int(cores),
+        explicit.get("spark.executor.memory"),
+        explicit.get("spark.executor.memoryOverhead"))
+    for line in result.explanation:
+        sys.stderr.write("sizing: {}\n".format(line))
+    if args.workers is None:
+        args.workers = result.workers
+    else:
+        sys.stderr.write("sizing: keeping {} worker(s) from the command "
+                         "line\n".format(args.workers))
+    args.sparkconfigs = configs.merge_pairs(result.sparkconfigs,
+                                            args.sparkconfigs)
+
+
+def write_documents(args, render_cache=None):
+    """write the rendered documents to a stream or an output directory
+
+    the clusters are loaded and validated before the output file is
+    opened, an invalid run leaves the file as it was.
+    """
+    if args.file is not None or args.sweeps:
+        # batch rendering pulls in multiprocessing and the manifest
+        # parsers, keep them off the path of a single cluster
+        from oshinko_temaki import batch
+
+        definitions = batch_definitions(args)
+        if args.output_dir is not None:
+            report = batch.write_directory(
+                definitions, args.output_dir, args.output,
+                args.processes, args.encoding, render_cache,
+                args.compiled)
+            sys.stderr.write(json.dumps(report))
+            sys.stderr.write("\n")
+            return
+
+        def write(stream):
+            batch.write_stream(definitions, args.output, args.processes,
+                               stream, args.format or "yaml",
+                               args.encoding, render_cache, args.compiled)
+    else:
+        document = render_document(args, render_cache)
+
+        def write(stream):
+            write_single(args, stream, document)
+
+    if args.output_file is None:
+        write(sys.stdout)
+    else:
+        with open(args.output_file, "w") as stream:
+            write(stream)
+
+
+def convert_documents(args):
+    """write the clusters of a stream in the other format
+
+    clusters that cannot be converted are reported on standard error as
+    they are found, followed by a summary of the counts.
+    """
+    from oshinko_temaki import convert
+
+    def report(description, exc):
+        if not isinstance(exc, convert.NotACluster):
+            sys.stderr.write("skipped {}: {}\n".format(description, exc))
+
+    converter = convert.Converter(args.encoding, report)
+    infile = sys.stdin if args.convert == "-" else open(args.convert)
+    stream = sys.stdout
+    if args.output_file is not None:
+        stream = open(args.output_file, "w")
+    try:
+        writers.write_documents(
+            converter.convert(convert.load_documents(infile)), stream,
+            args.format or "yaml")
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if stream is not sys.stdout:
+            stream.close()
+    sys.stderr.write(json.dumps(converter.summary()))
+    sys.stderr.write("\n")
+
+
+def apply_documents(args, render_cache=None):
+    """apply the rendered documents to an api server
+
+    every request is reported on standard error followed by a summary,
+    returns True when all of the documents were applied.
+    """
+    from oshinko_temaki import apply
+
+    token = os.environ.get("OSHT_TOKEN")
+    if args.token_file is not None:
+        with open(args.token_file) as infile:
+            token = infile.read().strip()
+
+    if args.file is not None or args.sweeps:
+        from oshinko_temaki import batch
+
+        documents = batch.render_all(batch_definitions(args), args.output,
+                                     args.processes, encoding=args.encoding,
+                                     cache=render_cache,
+                                     precompiled=args.compiled)
+    else:
+        documents = [render_document(args, render_cache)]
+
+    submitter = apply.Submitter(args.apply, args.namespace, token,
+                                args.concurrency, insecure=args.insecure,
+                                ca_file=args.ca_file,
+                                force=args.force_conflicts)
+    results = []
+    for result in submitter.apply(documents):
+        results.append(result)
+        sys.stderr.write("{} {}/{} {:.1f}ms{}\n".format(
+            result.status, result.kind, result.name, result.latency * 1000,
+            "" if result.error is None else " " + result.error))
+    summary = apply.summarize(results)
+    sys.stderr.write(json.dumps(summary))
+    sys.stderr.write("\n")
+    return summary["failed"] == 0
+
+
+def batch_definitions(args):
+    """return the cluster definitions of a manifest or a sweep
+
+    the definitions are validated first when --validate is given. a sweep
+    is returned as a generator and generated again for the validation, so
+    its points are never held in memory together.
+    """
+    from oshinko_temaki import batch
+
+    validate = args.output if args.validate else None
+    if not args.sweeps:
+        return batch.prepare(args.file, batch_defaults(args),
+                             args.stable_names or args.output_dir is not None,
+                             validate)
+
+    from oshinko_temaki import sweep
+
+    axes = sweep.parse_axes(args.sweeps)
+    defaults = batch_defaults(args)
+
+    def definitions():
+        return sweep.definitions(axes, defaults, args.name,
+                                 args.sweep_sample, args.sweep_seed)
+
+    if validate is not None:
+        validation.check_all(definitions(), validate)
+    return definitions()
+
+
+def batch_defaults(args):
+    """return the cluster fields given on the command line"""
+    defaults = {field: getattr(args, field)
+                for field in configs.FIELDS if field != "name"}
+    return {k: v for k, v in defaults.items() if v is not None}
+
+
+def render_document(args, render_cache=None):
+    """render the cluster described by the command line options"""
+    conf = configs.ClusterSpec.from_args(args)
     if args.output == "cr":
-        cluster = templates.CRDTemplate(conf)
+        template_class = templates.CRDTemplate
     else:
-        cluster = templates.CMTemplate(conf)
+        template_class = templates.CMTemplate
 
-    print(cluster.dumps())
+    if args.compiled:
+        from oshinko_temaki import compiled
+
+        document = compiled.get_plan(args.output, args.encoding).render(conf)
+    elif render_cache is None:
+        document = template_class(conf).dumps(args.encoding)
+    else:
+        document = render_cache.render(template_class, conf).dumps(
+            args.encoding)
+    return document
+
+
+def write_single(args, stream, document):
+    """write the document of a single cluster in the requested format"""
+    if args.format is None:
+        with instrument.stage("write"):
+            stream.write(document)
+            if not document.endswith("\n"):
+                stream.write("\n")
+    else:
+        writers.write_documents([document], stream, args.format)
 
 
 if __name__ == "__main__":
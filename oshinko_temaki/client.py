@@ -0,0 +1,117 @@
+"""the osht entry point, forwarding to a render daemon when one is running
+
+this module only imports what it needs to talk to the daemon, the cli
+and the templates are imported when the cluster has to be rendered in
+this process instead. that happens when no daemon is listening on the
+socket, or when the daemon declines a request it cannot serve.
+
+requests are the NUL separated fields "render", the working directory,
+the number of environment variables, the OSHT_ variables as NAME=VALUE
+and the arguments. the reply is a "status code length" line followed by
+that many bytes of standard output and then the standard error.
+"""
+import os
+import sys
+
+
+PROTOCOL = "osht/1"
+
+
+def socket_path():
+    """return the default daemon socket, or None if there is none
+
+    OSHT_SOCKET is used when it is set, otherwise osht.sock in the
+    XDG_RUNTIME_DIR. there is no fallback to a shared directory, another
+    user could put a socket there.
+    """
+    path = os.environ.get("OSHT_SOCKET")
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "osht.sock")
+    return None
+
+
+def encode_request(kind, argv=(), cwd="", env=None):
+    """build a request for the daemon"""
+    env = env or {}
+    fields = [PROTOCOL, kind, cwd, str(len(env))]
+    fields += ["{}={}".format(name, value) for name, value in env.items()]
+    fields += argv
+    return "\0".join(fields).encode("utf-8")
+
+
+def decode_reply(data):
+    """return the status, exit code, stdout and stderr of a reply"""
+    header, _, body = data.partition(b"\n")
+    status, code, length = header.decode("ascii").split(" ")
+    length = int(length)
+    return (status, int(code), body[:length].decode("utf-8"),
+            body[length:].decode("utf-8"))
+
+
+def send(path, request):
+    """send a request to the daemon and return its raw reply
+
+    returns None when there is no daemon listening on the socket.
+    """
+    import socket
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    except (AttributeError, OSError):
+        return None
+    with sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+        sock.sendall(request)
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def forward(argv, path=None):
+    """render through the daemon, returning the exit code
+
+    None is returned when the request has to be handled in process.
+    """
+    path = path or socket_path()
+    if path is None or not os.path.exists(path):
+        return None
+    env = {name: value for name, value in os.environ.items()
+           if name.startswith("OSHT_")}
+    reply = send(path, encode_request("render", argv, os.getcwd(), env))
+    if not reply:
+        return None
+    status, code, stdout, stderr = decode_reply(reply)
+    if status != "ok":
+        return None
+    sys.stdout.write(stdout)
+    sys.stdout.flush()
+    sys.stderr.write(stderr)
+    return code
+
+
+def main(argv=None):
+    """main entry point of osht"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        from oshinko_temaki import daemon
+
+        return daemon.main(argv[1:])
+
+    code = forward(argv)
+    if code is not None:
+        sys.exit(code)
+
+    from oshinko_temaki import cli
+
+    cli.main(argv)
@@ -0,0 +1,188 @@
+"""compiled template plans for bulk rendering
+
+a plan encodes the constant parts of a document type once and at render
+time only encodes the variable fields and splices them between the
+prepared fragments. the output is byte identical to serializing the
+matching template with the json or compact-json encoding, it just skips
+building the nested dicts and walking them with the json encoder.
+"""
+import json
+from json.encoder import encode_basestring_ascii
+
+from oshinko_temaki import configs
+from oshinko_temaki import instrument
+from oshinko_temaki import serializers
+from oshinko_temaki import templates
+
+
+SEPARATORS = {
+    "json": (", ", ": "),
+    "compact-json": (",", ":"),
+}
+
+
+class CompiledTemplate():
+    """a base for the document plans
+
+    subclasses fill in the fragments in _compile and join them in render.
+    """
+    def __init__(self, encoding="json"):
+        try:
+            self.item_sep, self.key_sep = SEPARATORS[encoding]
+        except KeyError:
+            raise ValueError(
+                "compiled templates do not support the {} encoding".format(
+                    encoding))
+        self.encoding = encoding
+        self.entry_keys = {
+            entry_type: ("{" + self.key(entry_type._fields[0], True),
+                         self.key(entry_type._fields[1]))
+            for entry_type in configs.ENTRY_TYPES.values()
+        }
+        self._compile()
+
+    def key(self, name, first=False):
+        """return the encoded prefix for a mapping key"""
+        prefix = "" if first else self.item_sep
+        return prefix + json.dumps(name) + self.key_sep
+
+    def resources(self, resources):
+        """encode the resource fields that follow the instances of a role"""
+        return "".join(self.key(key) + encode_basestring_ascii(value)
+                       for key, value in resources.items())
+
+    def volumes(self, volumes):
+        """encode the scratch volume fields that follow the resources"""
+        return "".join(self.key(key) + json.dumps(
+            value, separators=(self.item_sep, self.key_sep))
+            for key, value in volumes.items())
+
+    def mapping(self, values):
+        """encode a dict of strings as an object"""
+        return "{" + self.item_sep.join(
+            encode_basestring_ascii(key) + self.key_sep +
+            encode_basestring_ascii(value)
+            for key, value in values.items()) + "}"
+
+    def metadata(self, config, **labels):
+        """encode the labels and annotations that follow the name"""
+        parts = []
+        spec_labels = config.metadata("labels")
+        if spec_labels is not None:
+            labels.update(spec_labels)
+        if labels:
+            parts += [self.key("labels"), self.mapping(labels)]
+        annotations = config.metadata("annotations")
+        if annotations:
+            parts += [self.key("annotations"), self.mapping(annotations)]
+        return "".join(parts)
+
+    def entries(self, values):
+        """encode a tuple of spec entries as a list of dicts"""
+        items = []
+        for value in values:
+            first_key, second_key = self.entry_keys[type(value)]
+            items.append(first_key + encode_basestring_ascii(value[0]) +
+                         second_key + encode_basestring_ascii(value[1]) + "}")
+        return "[" + self.item_sep.join(items) + "]"
+
+    def _compile(self):
+        raise NotImplementedError
+
+    def render(self, config):
+        """render the serialized document for a spec or config"""
+        config = configs.ClusterSpec.from_args(config)
+        with instrument.stage("compiled"):
+            document = self._render(config)
+        instrument.document(document)
+        return document
+
+    def _render(self, config):
+        raise NotImplementedError
+
+
+class CompiledCRD(CompiledTemplate):
+    """a plan matching CRDTemplate"""
+    def _compile(self):
+        self.head = ("{" + self.key("apiVersion", True) +
+                     json.dumps("radanalytics.io/v1") + self.key("kind") +
+                     json.dumps("SparkCluster") + self.key("metadata") +
+                     "{" + self.key("name", True))
+        self.master = ("}" + self.key("spec") + "{" +
+                       self.key("master", True) + "{" +
+                       self.key("instances", True))
+        self.worker = ("}" + self.key("worker") + "{" +
+                       self.key("instances", True))
+        self.image = "}" + self.key("customImage")
+        self.metrics = self.key("metrics") + "true"
+        self.webui = self.key("sparkWebUI") + "true"
+        self.configmap = self.key("sparkConfigurationMap")
+        self.envs = self.key("env")
+        self.sparkconfigs = self.key("sparkConfiguration")
+        self.downloads = self.key("downloadData")
+
+    def _render(self, config):
+        parts = [self.head, encode_basestring_ascii(config.name),
+                 self.metadata(config), self.master, str(int(config.masters)),
+                 self.resources(config.resources("master")),
+                 self.worker, str(int(config.workers)),
+                 self.resources(config.resources("worker")),
+                 self.volumes(config.volumes("worker"))]
+        if config.image is not None:
+            parts += [self.image, encode_basestring_ascii(config.image)]
+        else:
+            parts.append("}")
+        if config.metrics is True:
+            parts.append(self.metrics)
+        if config.webui is True:
+            parts.append(self.webui)
+        if config.configmap is not None:
+            parts += [self.configmap,
+                      encode_basestring_ascii(config.configmap)]
+        if config.envs is not None:
+            parts += [self.envs, self.entries(config.envs)]
+        if config.sparkconfigs is not None:
+            parts += [self.sparkconfigs, self.entries(config.sparkconfigs)]
+        if config.downloads is not None:
+            parts += [self.downloads, self.entries(config.downloads)]
+        parts.append("}}")
+        return "".join(parts)
+
+
+class CompiledCM(CompiledTemplate):
+    """a plan matching CMTemplate
+
+    the embedded config is still emitted by the yaml serializer, only the
+    ConfigMap envelope around it is precompiled.
+    """
+    def _compile(self):
+        self.head = ("{" + self.key("apiVersion", True) + json.dumps("v1") +
+                     self.key("kind") + json.dumps("ConfigMap") +
+                     self.key("metadata") + "{" + self.key("name", True))
+        self.tail = "}" + self.key("data") + "{" + self.key("config", True)
+        self.yaml = serializers.get_serializer("yaml")
+
+    def _render(self, config):
+        data = templates.CMTemplate(config).config_data()
+        return "".join([self.head, encode_basestring_ascii(config.name),
+                        self.metadata(config, **{
+                            "radanalytics.io/kind": "SparkCluster"}),
+                        self.tail,
+                        encode_basestring_ascii(self.yaml.dumps(data)),
+                        "}}"])
+
+
+PLANS = {
+    "cr": CompiledCRD,
+    "cm": CompiledCM,
+}
+_compiled = {}
+
+
+def get_plan(output, encoding="json"):
+    """return the compiled plan for an output type, compiling it once"""
+    key = (output, encoding)
+    plan = _compiled.get(key)
+    if plan is None:
+        plan = _compiled[key] = PLANS[output](encoding)
+    return plan
@@ -1,13 +1,15 @@
 """configuration objects"""
-import uuid
+import collections
+import os
+
+from oshinko_temaki import instrument
 
 
 class ClusterConfig():
     """a helper to contain the defaults"""
     def __init__(self, args):
         """convert a set of parsed arguments into a config."""
-        self.set_parameter(
-            "name", args, 'spark-{}'.format(uuid.uuid4().hex[-4:]))
+        self.set_parameter("name", args, random_name())
         self.set_parameter("masters", args, 1)
         self.set_parameter("workers", args, 1)
         self.set_parameter("image", args, None)
@@ -17,6 +19,13 @@ class ClusterConfig():
         self.set_parameter("envs", args, None)
         self.set_parameter("sparkconfigs", args, None)
         self.set_parameter("downloads", args, None)
+        self.set_parameter("labels", args, None)
+        self.set_parameter("annotations", args, None)
+        self.set_parameter("scratch", args, None)
+        self.set_parameter("scratch_size", args, None)
+        self.set_parameter("worker_volumes", args, None)
+        for field in RESOURCE_FIELDS:
+            self.set_parameter(field, args, None)
 
     def set_parameter(self, name, source, default):
         """set the named parameter or default if the value is None"""
@@ -28,3 +37,335 @@ class ClusterConfig():
         if value is None:
             value = default
         setattr(self, name, value)
+
+
+ROLES = ("master", "worker")
+# the spark operator names for the resource fields of each role
+RESOURCES = {
+    "cpu_request": "cpuRequest",
+    "cpu_limit": "cpuLimit",
+    "memory_request": "memoryRequest",
+    "memory_limit": "memoryLimit",
+}
+RESOURCE_FIELDS = tuple("{}_{}".format(role, resource)
+                        for role in ROLES for resource in RESOURCES)
+FIELDS = ("name", "masters", "workers", "image", "metrics", "webui",
+          "configmap", "envs", "sparkconfigs", "downloads", "labels",
+          "annotations", "scratch", "scratch_size",
+          "worker_volumes") + RESOURCE_FIELDS
+INT_FIELDS = ("masters", "workers")
+BOOL_FIELDS = ("metrics", "webui", "worker_volumes")
+LIST_FIELDS = ("envs", "sparkconfigs", "downloads", "labels", "annotations")
+# worker scratch storage, a tmpfs, an emptyDir on the node disk or a
+# persistent volume claim created with every worker pod. the volumes are
+# emitted on the worker role, the radanalytics.io/v1 SparkCluster has no
+# such fields so worker_volumes has to say that the operator mounts them
+SCRATCH_KINDS = ("memory", "disk", "pvc")
+SCRATCH_VOLUME = "spark-scratch"
+SCRATCH_DIR = "/var/spark-scratch"
+
+
+def random_name():
+    """return a default cluster name with a random suffix"""
+    # os.urandom gives the same random suffix as a uuid4 without the
+    # import cost of the uuid module
+    return 'spark-{}'.format(os.urandom(2).hex())
+
+
+def merge_pairs(*groups, separator="="):
+    """merge lists of "KEY=VALUE" strings, later values win for a key
+
+    a key keeps the position where it first appeared, None groups are
+    skipped and None is returned if every group was None.
+    """
+    if all(group is None for group in groups):
+        return None
+
+    merged = {}
+    for group in groups:
+        for item in group or ():
+            merged[item.split(separator, 1)[0]] = item
+    return list(merged.values())
+
+
+def stable_name(definition):
+    """return a cluster name derived from the content of a definition
+
+    the same definition always gets the same name, which keeps rendered
+    output stable between runs.
+    """
+    import hashlib
+    import json
+
+    canonical = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return "spark-{}".format(digest[:8])
+
+
+def _split_entry(cls, text, form):
+    parts = text.split(cls.separator, 1) if isinstance(text, str) else ()
+    if len(parts) != 2 or not parts[0]:
+        raise ValueError("invalid {} {!r}, expected {}".format(
+            cls.kind, text, form))
+    return cls(*parts)
+
+
+class EnvVar(collections.namedtuple("EnvVar", "name value")):
+    """an environment variable for the cluster"""
+    __slots__ = ()
+    separator = "="
+    kind = "env"
+
+    @classmethod
+    def parse(cls, text):
+        """create an entry from a "NAME=VALUE" string"""
+        return _split_entry(cls, text, "NAME=VALUE")
+
+    def to_dict(self):
+        return {"name": self.name, "value": self.value}
+
+
+class SparkConfig(EnvVar):
+    """a spark configuration property for the cluster"""
+    __slots__ = ()
+    kind = "sparkconfig"
+
+
+class Label(EnvVar):
+    """a label for the metadata of the cluster documents"""
+    __slots__ = ()
+    kind = "label"
+
+
+class Annotation(EnvVar):
+    """an annotation for the metadata of the cluster documents"""
+    __slots__ = ()
+    kind = "annotation"
+
+
+class Download(collections.namedtuple("Download", "url to")):
+    """a url to download into a directory of the cluster"""
+    __slots__ = ()
+    separator = "::"
+    kind = "download"
+
+    @classmethod
+    def parse(cls, text):
+        """create an entry from a "URL::DIR" string"""
+        return _split_entry(cls, text, "URL::DIR")
+
+    def to_dict(self):
+        return {"url": self.url, "to": self.to}
+
+
+ENTRY_TYPES = {
+    "envs": EnvVar,
+    "sparkconfigs": SparkConfig,
+    "downloads": Download,
+    "labels": Label,
+    "annotations": Annotation,
+}
+
+
+def parse_entries(entry_type, values):
+    """convert a list of strings or entries into a tuple of entries"""
+    if values is None:
+        return None
+    return tuple(value if isinstance(value, entry_type)
+                 else entry_type.parse(value) for value in values)
+
+
+def _with_entry(entries, entry):
+    # an explicit entry for the same key wins over the default one
+    if entries is None:
+        return (entry,)
+    if any(value[0] == entry[0] for value in entries):
+        return entries
+    return entries + (entry,)
+
+
+def _scratch_entries(values):
+    kind, size = values["scratch"], values["scratch_size"]
+    if kind is None:
+        if size is not None:
+            raise ValueError("a scratch size requires a scratch kind")
+        return
+    if kind not in SCRATCH_KINDS:
+        raise ValueError("invalid scratch {!r}, expected one of {}".format(
+            kind, ", ".join(SCRATCH_KINDS)))
+    if not values["worker_volumes"]:
+        # spark would be pointed at a directory that is never mounted
+        raise ValueError(
+            "scratch storage needs an operator that mounts worker volumes, "
+            "the radanalytics.io/v1 SparkCluster does not. set "
+            "worker_volumes (--worker-volumes) if the operator does")
+    if size is None:
+        if kind != "disk":
+            raise ValueError("{} scratch requires a size".format(kind))
+    else:
+        from oshinko_temaki import sizing
+
+        values["scratch_size"] = size = str(size)
+        try:
+            sizing.parse_quantity(size)
+        except ValueError as exc:
+            raise ValueError("scratch_size: {}".format(exc))
+    values["envs"] = _with_entry(
+        values["envs"], EnvVar("SPARK_LOCAL_DIRS", SCRATCH_DIR))
+    values["sparkconfigs"] = _with_entry(
+        values["sparkconfigs"], SparkConfig("spark.local.dir", SCRATCH_DIR))
+
+
+def normalize_definition(definition):
+    """check a cluster definition and coerce its values to the cli types
+
+    a value of the wrong type raises a ValueError naming its field.
+    """
+    if not isinstance(definition, dict):
+        raise ValueError("cluster definitions must be mappings, "
+                         "got {!r}".format(definition))
+
+    unknown = set(definition) - set(FIELDS)
+    if unknown:
+        raise ValueError("unknown cluster fields: {}".format(
+            ", ".join(sorted(unknown))))
+
+    normalized = {}
+    for key, value in definition.items():
+        if value is None:
+            continue
+        if key in INT_FIELDS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError("{}: expected an integer, got {!r}".format(
+                    key, value))
+        elif key in BOOL_FIELDS:
+            if isinstance(value, str):
+                value = value.strip().lower() in ("1", "true", "yes", "on")
+            elif not isinstance(value, bool):
+                raise ValueError("{}: expected a boolean, got {!r}".format(
+                    key, value))
+        elif key in LIST_FIELDS:
+            if isinstance(value, str):
+                value = [value]
+            elif isinstance(value, dict):
+                separator = ENTRY_TYPES[key].separator
+                value = ["{}{}{}".format(k, separator, v)
+                         for k, v in value.items()]
+            elif not isinstance(value, (list, tuple)):
+                raise ValueError("{}: expected a list, got {!r}".format(
+                    key, value))
+        elif isinstance(value, (dict, list, tuple)):
+            raise ValueError("{}: expected a single value, got {!r}".format(
+                key, value))
+        normalized[key] = value
+    return normalized
+
+
+class ClusterSpec(collections.namedtuple("ClusterSpec", FIELDS)):
+    """an immutable and compact description of a cluster
+
+    the envs, sparkconfigs, downloads, labels and annotations are tuples
+    of the matching ENTRY_TYPES entries, or None when they were not given.
+    a scratch kind adds SPARK_LOCAL_DIRS and spark.local.dir entries for
+    the scratch volume, unless they were given explicitly.
+    templates read a spec directly, so a cluster is only held in memory
+    once.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def create(cls, **fields):
+        """create a spec, applying the defaults and parsing the entries
+
+        resources must be kubernetes quantities. the executor memory and a
+        memory scratch volume are checked against the worker memory when
+        it is given.
+        """
+        with instrument.stage("config"):
+            values = dict.fromkeys(FIELDS)
+            values.update(fields)
+            if values["name"] is None:
+                values["name"] = random_name()
+            for field in INT_FIELDS:
+                if values[field] is None:
+                    values[field] = 1
+            for field, entry_type in ENTRY_TYPES.items():
+                values[field] = parse_entries(entry_type, values[field])
+            _scratch_entries(values)
+
+            spec = cls(**values)
+            resources = [(field, values[field]) for field in RESOURCE_FIELDS
+                         if values[field] is not None]
+            if resources:
+                from oshinko_temaki import sizing
+
+                for field, value in resources:
+                    try:
+                        sizing.parse_quantity(value)
+                    except ValueError as exc:
+                        raise ValueError("{}: {}".format(field, exc))
+                if spec.worker_memory_limit or spec.worker_memory_request:
+                    sizing.check_executor_fit(spec)
+            return spec
+
+    def metadata(self, field):
+        """return the labels or annotations as a dict, later keys win"""
+        values = getattr(self, field)
+        if values is None:
+            return None
+        return dict(values)
+
+    def resources(self, role):
+        """return the resource fields of a role in the operator names"""
+        resources = {}
+        for field, key in RESOURCES.items():
+            value = getattr(self, "{}_{}".format(role, field))
+            if value is not None:
+                resources[key] = str(value)
+        return resources
+
+    def volumes(self, role):
+        """return the scratch volume fields of a role, only workers get one"""
+        if role != "worker" or self.scratch is None:
+            return {}
+        if self.scratch == "pvc":
+            # a claim per worker pod, deleted together with the pod
+            source = {"ephemeral": {"volumeClaimTemplate": {"spec": {
+                "accessModes": ["ReadWriteOnce"],
+                "resources": {"requests": {"storage": self.scratch_size}},
+            }}}}
+        else:
+            empty_dir = {}
+            if self.scratch == "memory":
+                empty_dir["medium"] = "Memory"
+            if self.scratch_size is not None:
+                empty_dir["sizeLimit"] = self.scratch_size
+            source = {"emptyDir": empty_dir}
+        return {
+            "volumes": [dict(name=SCRATCH_VOLUME, **source)],
+            "volumeMounts": [{"name": SCRATCH_VOLUME,
+                              "mountPath": SCRATCH_DIR}],
+        }
+
+    @classmethod
+    def from_args(cls, args):
+        """create a spec from parsed arguments or a ClusterConfig"""
+        if isinstance(args, cls):
+            return args
+        return cls.create(**{field: getattr(args, field, None)
+                             for field in FIELDS})
+
+    @classmethod
+    def from_dict(cls, definition):
+        """create a spec from a mapping of cluster fields"""
+        return cls.create(**normalize_definition(definition))
+
+    @classmethod
+    def from_file(cls, path):
+        """create a spec from a yaml or json file holding one mapping"""
+        from oshinko_temaki import serializers
+
+        with open(path) as infile:
+            return cls.from_dict(serializers.load_yaml(infile))
@@ -0,0 +1,265 @@
+"""convert clusters between the ConfigMap and the SparkCluster formats
+
+documents are read from a multi-document yaml stream, such as the output
+of "oc get cm -o yaml", and every cluster is written back out in the
+other format as soon as it has been read. the items of a List are taken
+one at a time, so memory use depends on the size of the largest
+document and not on the size of the stream.
+"""
+from oshinko_temaki import configs
+from oshinko_temaki import serializers
+from oshinko_temaki import templates
+
+
+KIND_LABEL = "radanalytics.io/kind"
+# annotations that describe the previous object and must not be carried
+DROPPED_ANNOTATIONS = ("kubectl.kubernetes.io/last-applied-configuration",)
+ROLE_FIELDS = {"instances"} | set(configs.RESOURCES.values())
+VOLUME_FIELDS = ("volumes", "volumeMounts")
+SPEC_FIELDS = {
+    "customImage": "image",
+    "metrics": "metrics",
+    "sparkWebUI": "webui",
+    "sparkConfigurationMap": "configmap",
+    "env": "envs",
+    "sparkConfiguration": "sparkconfigs",
+    "downloadData": "downloads",
+}
+
+
+def _stream_loader():
+    import yaml
+
+    loader_class = serializers.yaml_loader()
+    if not hasattr(loader_class, "compose_node"):
+        # the c parser only composes whole documents, the composer of the
+        # python loader works on its events to compose one node at a time
+        loader_class = type("StreamLoader",
+                            (loader_class, yaml.composer.Composer), {})
+    return loader_class
+
+
+def load_documents(stream):
+    """generate the documents of a yaml stream, and the items of Lists
+
+    a top level mapping with an "items" sequence is a List, its items are
+    composed and generated one by one instead of the List as a whole.
+    """
+    import yaml
+
+    loader = _stream_loader()(stream)
+    loader.anchors = {}
+    try:
+        loader.get_event()
+        while not loader.check_event(yaml.StreamEndEvent):
+            loader.get_event()
+            if loader.check_event(yaml.MappingStartEvent):
+                yield from _mapping_items(loader)
+            else:
+                document = loader.construct_document(
+                    loader.compose_node(None, None))
+                if document is not None:
+                    yield document
+            loader.get_event()
+            loader.anchors = {}
+    finally:
+        loader.dispose()
+
+
+def _mapping_items(loader):
+    import yaml
+
+    loader.get_event()
+    document = {}
+    listed = False
+    while not loader.check_event(yaml.MappingEndEvent):
+        key = loader.construct_document(loader.compose_node(None, None))
+        if key == "items" and loader.check_event(yaml.SequenceStartEvent):
+            listed = True
+            loader.get_event()
+            while not loader.check_event(yaml.SequenceEndEvent):
+                yield loader.construct_document(
+                    loader.compose_node(None, None))
+            loader.get_event()
+        else:
+            document[key] = loader.construct_document(
+                loader.compose_node(None, None))
+    loader.get_event()
+    if not listed:
+        yield document
+
+
+class NotACluster(ValueError):
+    """raised for documents that do not describe a cluster at all"""
+
+
+def _metadata(metadata, fields):
+    labels = dict(metadata.get("labels") or {})
+    labels.pop(KIND_LABEL, None)
+    if labels:
+        fields["labels"] = labels
+    annotations = {key: value for key, value
+                   in (metadata.get("annotations") or {}).items()
+                   if key not in DROPPED_ANNOTATIONS}
+    if annotations:
+        fields["annotations"] = annotations
+
+
+def _scratch(volumes):
+    # the kind and size of a scratch volume, the whole volume is compared
+    # with the one of the created spec afterwards
+    volume = volumes[0] if isinstance(volumes, list) and volumes else None
+    if not isinstance(volume, dict):
+        raise ValueError("unsupported worker volumes")
+    if "ephemeral" in volume:
+        try:
+            claim = volume["ephemeral"]["volumeClaimTemplate"]["spec"]
+            return "pvc", claim["resources"]["requests"]["storage"]
+        except (KeyError, TypeError):
+            raise ValueError("unsupported worker volumes")
+    empty_dir = volume.get("emptyDir")
+    if not isinstance(empty_dir, dict):
+        raise ValueError("unsupported worker volumes")
+    kind = "memory" if empty_dir.get("medium") == "Memory" else "disk"
+    return kind, empty_dir.get("sizeLimit")
+
+
+def _cluster_fields(config, fields):
+    if not isinstance(config, dict):
+        raise ValueError("the cluster config is not a mapping")
+    for role in configs.ROLES:
+        values = config.get(role) or {}
+        supported = ROLE_FIELDS
+        if role == "worker":
+            supported = supported | set(VOLUME_FIELDS)
+        unknown = set(values) - supported
+        if unknown:
+            raise ValueError("unsupported {} fields: {}".format(
+                role, ", ".join(sorted(unknown))))
+        if "instances" in values:
+            fields[role + "s"] = values["instances"]
+        for field, key in configs.RESOURCES.items():
+            if key in values:
+                fields["{}_{}".format(role, field)] = values[key]
+        if role == "worker" and any(key in values for key in VOLUME_FIELDS):
+            fields["scratch"], fields["scratch_size"] = _scratch(
+                values.get("volumes"))
+            fields["worker_volumes"] = True
+
+    unknown = set(config) - set(SPEC_FIELDS) - set(configs.ROLES)
+    if unknown:
+        raise ValueError("unsupported fields: {}".format(
+            ", ".join(sorted(unknown))))
+    for key, field in SPEC_FIELDS.items():
+        value = config.get(key)
+        if value is None:
+            continue
+        entry_type = configs.ENTRY_TYPES.get(field)
+        if entry_type is not None:
+            value = [entry_type(*(str(item[name])
+                                  for name in entry_type._fields))
+                     if isinstance(item, dict) else item for item in value]
+        fields[field] = value
+
+
+def read_document(document):
+    """return the output type and ClusterSpec of a cluster document
+
+    raises a NotACluster for documents of other kinds, and a ValueError
+    saying what is wrong for clusters that cannot be converted.
+    """
+    import yaml
+
+    if not isinstance(document, dict):
+        raise NotACluster("not a mapping")
+    kind = document.get("kind")
+    metadata = document.get("metadata") or {}
+    labels = metadata.get("labels") if isinstance(metadata, dict) else None
+    if kind == "SparkCluster":
+        source = "cr"
+    elif (kind == "ConfigMap" and isinstance(labels, dict) and
+          labels.get(KIND_LABEL) == "SparkCluster"):
+        source = "cm"
+    else:
+        raise NotACluster("not a cluster")
+
+    # from here on the document is a cluster, anything wrong with it is
+    # reported instead of ending the conversion
+    try:
+        if not isinstance(metadata, dict):
+            raise ValueError("the metadata is not a mapping")
+        fields = {"name": metadata.get("name")}
+        _metadata(metadata, fields)
+        if source == "cr":
+            config = document.get("spec")
+        else:
+            config = (document.get("data") or {}).get("config")
+            if not isinstance(config, str):
+                raise ValueError("no cluster config")
+            config = serializers.load_yaml(config)
+        _cluster_fields(config, fields)
+        spec = configs.ClusterSpec.from_dict(fields)
+        worker = config.get("worker") or {}
+        volumes = {key: worker[key] for key in VOLUME_FIELDS if key in worker}
+        if volumes != spec.volumes("worker"):
+            raise ValueError("unsupported worker volumes")
+        return source, spec
+    except (AttributeError, KeyError, TypeError, ValueError,
+            yaml.YAMLError) as exc:
+        raise ValueError("invalid cluster: {}".format(exc))
+
+
+class Converter():
+    """convert documents to the other format, counting what was skipped
+
+    a converted document keeps the namespace of the original one.
+    report is called with a description of every skipped document and
+    the exception saying why, nothing about them is kept.
+    """
+    def __init__(self, encoding="json", report=None):
+        self.encoding = encoding
+        self.report = report
+        self.converted = 0
+        self.skipped = 0
+
+    def convert(self, documents):
+        """generate the converted serialized documents"""
+        for document in documents:
+            try:
+                source, spec = read_document(document)
+            except ValueError as exc:
+                self.skipped += 1
+                if self.report is not None:
+                    self.report(describe(document), exc)
+                continue
+            template_class = (templates.CMTemplate if source == "cr"
+                              else templates.CRDTemplate)
+            metadata = document.get("metadata") or {}
+            yield self.dumps(template_class(spec),
+                             metadata.get("namespace"))
+            self.converted += 1
+
+    def dumps(self, template, namespace=None):
+        """serialize a converted cluster, keeping its namespace"""
+        if namespace is None:
+            return template.dumps(self.encoding)
+        data = template.render()
+        metadata = {"name": data["metadata"]["name"],
+                    "namespace": namespace}
+        metadata.update(data["metadata"])
+        data["metadata"] = metadata
+        return type(template).from_data(data, template.spec).dumps(
+            self.encoding)
+
+    def summary(self):
+        """return the counts of converted and skipped documents"""
+        return {"converted": self.converted, "skipped": self.skipped}
+
+
+def describe(document):
+    """return a short kind/name description of a document"""
+    if not isinstance(document, dict):
+        return repr(document)[:40]
+    metadata = document.get("metadata")
+    name = metadata.get("name") if isinstance(metadata, dict) else None
+    return "{}/{}".format(document.get("kind"), name)
@@ -0,0 +1,250 @@
+"""a render daemon answering osht requests on a unix socket
+
+the daemon keeps the cli parser, the templates and the compiled plans
+loaded, a request only pays for parsing its arguments and rendering.
+every request runs in its own thread with standard output and standard
+error captured for that thread, so requests can be served concurrently.
+
+requests that depend on the state of the calling process or would
+affect the other requests are declined, the client then renders them
+itself. that is reading standard input, applying to a server, timings,
+profiling, a cache file and process pools.
+"""
+import argparse
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+from oshinko_temaki import cli
+from oshinko_temaki import client
+from oshinko_temaki import instrument
+
+
+# options holding paths, they are relative to the directory of the client
+PATH_OPTIONS = ("file", "output_file", "output_dir", "profile_dir",
+                "sparkconfig_files", "env_files", "convert")
+
+
+class _ThreadStream():
+    """a stream writing to a buffer of the current thread, if it has one"""
+    def __init__(self, stream, local, name):
+        self._stream = stream
+        self._local = local
+        self._name = name
+
+    def _target(self):
+        return getattr(self._local, self._name, None) or self._stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+def declined(args):
+    """return True if the daemon must leave the parsed request to the client"""
+    return (args.file == "-" or args.convert == "-" or
+            args.apply is not None or args.timings or
+            args.profile_out is not None or args.cache_file is not None or
+            (args.processes or 0) > 1)
+
+
+def resolve(args, cwd, env, parser):
+    """make the paths and environment defaults those of the client"""
+    for option in PATH_OPTIONS:
+        value = getattr(args, option)
+        if isinstance(value, list):
+            setattr(args, option, [os.path.join(cwd, item)
+                                   for item in value])
+        elif value is not None and value != "-":
+            setattr(args, option, os.path.join(cwd, value))
+    if args.profile_dir == parser.get_default("profile_dir"):
+        profile_dir = env.get("OSHT_PROFILE_DIR")
+        args.profile_dir = (None if profile_dir is None
+                            else os.path.join(cwd, profile_dir))
+    if args.profile is not None:
+        path = os.path.join(cwd, args.profile)
+        if os.path.isfile(path):
+            args.profile = path
+
+
+def exit_code(exc):
+    """return the exit status of a SystemExit the way python would"""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    sys.stderr.write("{}\n".format(exc.code))
+    return 1
+
+
+class RenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """serve render requests and keep statistics of their latency"""
+    daemon_threads = True
+
+    def __init__(self, path):
+        # only the owner of the daemon may connect to it
+        umask = os.umask(0o177)
+        try:
+            super().__init__(path, RequestHandler)
+        finally:
+            os.umask(umask)
+        self.path = path
+        self.started = time.time()
+        self.latency = instrument.Histogram()
+        self.declined = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.parser = cli.build_parser()
+        # output of the request threads goes to their buffers, the rest of
+        # the process keeps writing to the real streams
+        self._streams = sys.stdout, sys.stderr
+        sys.stdout = _ThreadStream(sys.stdout, self.local, "stdout")
+        sys.stderr = _ThreadStream(sys.stderr, self.local, "stderr")
+
+    def warm_up(self):
+        """render one cluster of each type to load everything up front"""
+        from oshinko_temaki import batch  # noqa: F401
+
+        for output in ("cr", "cm"):
+            for encoding in ("json", "yaml"):
+                self.render(["-n", "warm-up", "-o", output,
+                             "--encoding", encoding], "/", {})
+
+    def render(self, argv, cwd, env):
+        """run the cli for a request, returning its reply fields"""
+        stdout = self.local.stdout = io.StringIO()
+        stderr = self.local.stderr = io.StringIO()
+        try:
+            args = self.parser.parse_args(argv)
+            if declined(args):
+                return "declined", 0, "", ""
+            resolve(args, cwd, env, self.parser)
+            cli.run(self.parser, args)
+            code = 0
+        except SystemExit as exc:
+            code = exit_code(exc)
+        except Exception as exc:
+            sys.stderr.write("error: {}\n".format(exc))
+            code = 1
+        finally:
+            self.local.stdout = self.local.stderr = None
+        return "ok", code, stdout.getvalue(), stderr.getvalue()
+
+    def stats(self):
+        """return the request counts and latencies in microseconds"""
+        with self.lock:
+            return {
+                "uptime_s": time.time() - self.started,
+                "declined": self.declined,
+                "latency_us": self.latency.summary(),
+            }
+
+    def server_close(self):
+        super().server_close()
+        sys.stdout, sys.stderr = self._streams
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        start = time.perf_counter()
+        fields = self.rfile.read().decode("utf-8").split("\0")
+        if len(fields) < 4 or fields[0] != client.PROTOCOL:
+            self.reply("error", 2, "", "unsupported request\n")
+            return
+
+        kind, cwd, count = fields[1], fields[2], int(fields[3])
+        env = dict(item.split("=", 1) for item in fields[4:4 + count])
+        argv = fields[4 + count:]
+        if kind == "stats":
+            self.reply("ok", 0, json.dumps(self.server.stats()) + "\n", "")
+            return
+        if kind == "stop":
+            threading.Thread(target=self.server.shutdown).start()
+            self.reply("ok", 0, "", "")
+            return
+
+        status, code, stdout, stderr = self.server.render(argv, cwd, env)
+        self.reply(status, code, stdout, stderr)
+        with self.server.lock:
+            if status == "ok":
+                self.server.latency.add(
+                    (time.perf_counter() - start) * 1e6)
+            else:
+                self.server.declined += 1
+
+    def reply(self, status, code, stdout, stderr):
+        stdout = stdout.encode("utf-8")
+        self.wfile.write("{} {} {}\n".format(status, code, len(stdout))
+                         .encode("ascii"))
+        self.wfile.write(stdout)
+        self.wfile.write(stderr.encode("utf-8"))
+
+
+def serve(path):
+    """run a daemon on a socket until it is stopped"""
+    if os.path.exists(path):
+        if client.send(path, client.encode_request("stats")) is not None:
+            raise ValueError("a daemon is already running on {}".format(path))
+        # a socket left behind by a daemon that did not shut down cleanly
+        os.remove(path)
+
+    server = RenderServer(path)
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(
+        target=server.shutdown).start())
+    try:
+        server.warm_up()
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    """entry point of osht serve"""
+    parser = argparse.ArgumentParser(
+        prog="osht serve",
+        description="keep the templates loaded behind a unix socket, osht "
+                    "forwards its arguments to a running daemon")
+    parser.add_argument("--socket",
+                        dest="socket",
+                        default=client.socket_path(),
+                        help="path of the socket, default is OSHT_SOCKET "
+                             "or osht.sock in XDG_RUNTIME_DIR")
+    parser.add_argument("--stats",
+                        dest="stats",
+                        help="print the statistics of the running daemon",
+                        action="store_true")
+    parser.add_argument("--stop",
+                        dest="stop",
+                        help="stop the running daemon",
+                        action="store_true")
+    args = parser.parse_args(argv)
+    if args.socket is None:
+        parser.error("no socket path, set --socket, OSHT_SOCKET or "
+                     "XDG_RUNTIME_DIR")
+
+    if args.stats or args.stop:
+        reply = client.send(args.socket, client.encode_request(
+            "stats" if args.stats else "stop"))
+        if reply is None:
+            parser.error("no daemon running on {}".format(args.socket))
+        sys.stdout.write(client.decode_reply(reply)[2])
+        return
+
+    try:
+        serve(args.socket)
+    except ValueError as exc:
+        parser.error(str(exc))
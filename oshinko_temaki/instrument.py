@@ -0,0 +1,130 @@
+"""stage timing hooks for the render pipeline
+
+the library reports how long each stage takes through stage() and the
+size of every serialized document through document(). nothing is
+measured until a hook is registered with add_hook, so the cost for
+callers that do not care is a check of an empty list.
+
+a hook is any object with a stage(name, seconds) and a document(size)
+method, Timings is the one the cli uses. hooks only see the work of the
+current process, pool workers in batch mode are not measured.
+"""
+import collections
+import time
+
+
+_hooks = []
+
+
+class _NullStage():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage():
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.name, time.perf_counter() - self.start)
+
+
+def add_hook(hook):
+    """start sending stage timings and document sizes to a hook"""
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """stop sending measurements to a hook"""
+    _hooks.remove(hook)
+
+
+def stage(name):
+    """return a context manager that times a named stage"""
+    if not _hooks:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def record(name, seconds):
+    """report a stage duration that was measured elsewhere"""
+    for hook in _hooks:
+        hook.stage(name, seconds)
+
+
+def document(document):
+    """report the size of a serialized document"""
+    if _hooks:
+        size = len(document.encode("utf-8"))
+        for hook in _hooks:
+            hook.document(size)
+
+
+class Histogram():
+    """a count, total and power of two buckets of some values"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = collections.Counter()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.buckets[max(0, int(value)).bit_length()] += 1
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            # bucket n holds the values below 2**n
+            "buckets": {str(2 ** bucket): count for bucket, count
+                        in sorted(self.buckets.items())},
+        }
+
+
+class Timings():
+    """a hook aggregating stage durations in microseconds and sizes"""
+    def __init__(self):
+        self.stages = collections.OrderedDict()
+        self.sizes = Histogram()
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        remove_hook(self)
+
+    def stage(self, name, seconds):
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages[name] = Histogram()
+        histogram.add(seconds * 1e6)
+
+    def document(self, size):
+        self.sizes.add(size)
+
+    def summary(self):
+        """return the aggregated measurements as plain data"""
+        return {
+            "stages_us": {name: histogram.summary()
+                          for name, histogram in self.stages.items()},
+            "document_bytes": self.sizes.summary(),
+        }
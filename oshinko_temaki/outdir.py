@@ -0,0 +1,126 @@
+"""incremental output of rendered documents into a directory"""
+import hashlib
+import json
+import os
+import re
+
+from oshinko_temaki import validation
+
+
+INDEX_FILE = ".osht-index.json"
+NAME = re.compile(validation.NAME_PATTERN)
+EXTENSIONS = {
+    "json": ".json",
+    "compact-json": ".json",
+    "yaml": ".yaml",
+}
+
+
+def content_hash(document):
+    """return the sha256 hex digest of a serialized document"""
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+class OutputDirectory():
+    """keep one file per cluster in a directory, rewriting only changes
+
+    an index of the file names and content hashes written by the last run
+    is kept in the directory, files whose hash has not changed are not
+    touched and clusters missing from a run have their files removed.
+    cluster names must be valid kubernetes names, and no file outside the
+    directory is ever written or removed, whatever the index says.
+    """
+    def __init__(self, path, encoding="json"):
+        self.path = path
+        self.extension = EXTENSIONS[encoding]
+        self.index_path = os.path.join(path, INDEX_FILE)
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.unchanged = 0
+        self._previous = {}
+        self._current = {}
+
+        os.makedirs(path, exist_ok=True)
+        self._root = os.path.realpath(path)
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as infile:
+                self._previous = json.load(infile)
+            for entry in self._previous.values():
+                self._file_path(entry["file"])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # a failed run must not remove the files it did not get to
+        if exc_type is None:
+            self.close()
+
+    def _file_path(self, filename):
+        # only plain files directly in the directory, a symlink among them
+        # is replaced or removed itself and not followed
+        path = os.path.normpath(os.path.join(self._root, filename))
+        if (filename in ("", ".", "..") or
+                os.path.dirname(path) != self._root):
+            raise ValueError("{!r} is not a file in {}".format(
+                filename, self.path))
+        return path
+
+    def write(self, name, document):
+        """write a document for the named cluster if its content changed"""
+        if not isinstance(name, str) or not NAME.match(name):
+            raise ValueError("invalid cluster name {!r}".format(name))
+        if name in self._current:
+            raise ValueError("duplicate cluster name {}".format(name))
+
+        filename = name + self.extension
+        path = self._file_path(filename)
+        digest = content_hash(document)
+        self._current[name] = {"file": filename, "sha256": digest}
+
+        previous = self._previous.get(name)
+        if (previous is not None and previous["sha256"] == digest and
+                previous["file"] == filename and os.path.exists(path)):
+            self.unchanged += 1
+            return
+
+        if previous is not None and previous["file"] != filename:
+            old_path = self._file_path(previous["file"])
+            if os.path.exists(old_path):
+                os.remove(old_path)
+
+        tmp = path + ".tmp"
+        with open(tmp, "w") as outfile:
+            outfile.write(document)
+            if not document.endswith("\n"):
+                outfile.write("\n")
+        os.replace(tmp, path)
+        if previous is None:
+            self.added.append(name)
+        else:
+            self.changed.append(name)
+
+    def close(self):
+        """remove the files of clusters that were not written and save"""
+        for name, entry in self._previous.items():
+            if name in self._current:
+                continue
+            path = self._file_path(entry["file"])
+            if os.path.lexists(path):
+                os.remove(path)
+            self.removed.append(name)
+
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as outfile:
+            json.dump(self._current, outfile, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+    def report(self):
+        """return the names that were added, changed and removed"""
+        return {
+            "added": self.added,
+            "changed": self.changed,
+            "removed": self.removed,
+            "unchanged": self.unchanged,
+        }
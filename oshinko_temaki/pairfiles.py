@@ -0,0 +1,89 @@
+"""readers for files of spark configuration and environment variables
+
+the readers go through a file line by line and generate "KEY=VALUE"
+strings as they are found, ready to be merged with merge_pairs. nothing
+is collected in between, later duplicates of a key are left for the
+merge to resolve.
+"""
+import re
+
+from oshinko_temaki import validation
+
+
+# a java properties entry as spark reads spark-defaults.conf, the key ends
+# at the first "=", ":" or whitespace
+PROPERTY = re.compile(r"^([^=:\s]+)\s*[=:\s]\s*(.*)$")
+ENV_NAME = re.compile(validation.ENV_NAME_PATTERN)
+
+
+def read_spark_defaults(lines, source="spark-defaults.conf"):
+    """generate the properties of a spark-defaults.conf file
+
+    blank lines and lines starting with "#" or "!" are skipped, a key
+    without a value gets an empty one. source is accepted for the same
+    signature as read_dotenv, no line can be invalid here.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in "#!":
+            continue
+        match = PROPERTY.match(line)
+        if match is None:
+            # a key alone on its line
+            yield line + "="
+        else:
+            yield "{}={}".format(*match.groups())
+
+
+def _unquote(value, source, number):
+    quote = value[0]
+    end = value.find(quote, 1)
+    while quote == '"' and end > 0 and value[end - 1] == "\\":
+        end = value.find(quote, end + 1)
+    if end < 0:
+        raise ValueError("{}:{}: unterminated {} quote".format(
+            source, number, quote))
+    value = value[1:end]
+    if quote == '"':
+        value = value.replace('\\"', '"').replace("\\n", "\n")
+    return value
+
+
+def read_dotenv(lines, source=".env"):
+    """generate the variables of a dotenv file
+
+    lines are NAME=VALUE, optionally starting with "export". values can be
+    single or double quoted, double quoted values understand \\" and \\n.
+    a "#" starts a comment on its own line or after an unquoted value.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[7:].lstrip()
+        name, separator, value = line.partition("=")
+        name = name.strip()
+        if not separator or not ENV_NAME.match(name):
+            raise ValueError("{}:{}: expected NAME=VALUE, got {!r}".format(
+                source, number, line))
+        value = value.strip()
+        if value[:1] in ("'", '"'):
+            value = _unquote(value, source, number)
+        else:
+            value = value.split(" #", 1)[0].rstrip()
+        yield "{}={}".format(name, value)
+
+
+READERS = {
+    "sparkconfigs": read_spark_defaults,
+    "envs": read_dotenv,
+}
+
+
+def read_files(field, paths):
+    """generate the pairs of every file in order, for a list field"""
+    reader = READERS[field]
+    for path in paths:
+        with open(path) as infile:
+            yield from reader(infile, path)
@@ -0,0 +1,115 @@
+"""named bundles of spark performance settings"""
+import os
+
+
+# the built in profiles, bump a version whenever its settings change
+PROFILES = {
+    "throughput": {
+        "version": 1,
+        "description": "large batch jobs, favours total work done",
+        "sparkconfigs": {
+            "spark.serializer": "org.apache.spark.serializer.KryoSerializer",
+            "spark.sql.adaptive.enabled": "true",
+            "spark.sql.adaptive.coalescePartitions.enabled": "true",
+            "spark.sql.adaptive.skewJoin.enabled": "true",
+            "spark.shuffle.compress": "true",
+            "spark.shuffle.spill.compress": "true",
+            "spark.io.compression.codec": "lz4",
+            "spark.sql.autoBroadcastJoinThreshold": "64m",
+            "spark.dynamicAllocation.enabled": "true",
+            "spark.dynamicAllocation.shuffleTracking.enabled": "true",
+        },
+    },
+    "latency": {
+        "version": 1,
+        "description": "short interactive queries, favours response time",
+        "sparkconfigs": {
+            "spark.serializer": "org.apache.spark.serializer.KryoSerializer",
+            "spark.sql.adaptive.enabled": "true",
+            "spark.sql.adaptive.coalescePartitions.enabled": "true",
+            "spark.scheduler.mode": "FAIR",
+            "spark.locality.wait": "0s",
+            "spark.speculation": "true",
+            "spark.sql.autoBroadcastJoinThreshold": "32m",
+            "spark.dynamicAllocation.enabled": "false",
+        },
+    },
+    "memory-lean": {
+        "version": 1,
+        "description": "small executors, trades cpu for a lower footprint",
+        "sparkconfigs": {
+            "spark.serializer": "org.apache.spark.serializer.KryoSerializer",
+            "spark.sql.adaptive.enabled": "true",
+            "spark.rdd.compress": "true",
+            "spark.shuffle.compress": "true",
+            "spark.shuffle.spill.compress": "true",
+            "spark.io.compression.codec": "zstd",
+            "spark.sql.inMemoryColumnarStorage.compressed": "true",
+            "spark.sql.autoBroadcastJoinThreshold": "10m",
+            "spark.memory.fraction": "0.5",
+        },
+    },
+}
+PROFILE_EXTENSIONS = (".yaml", ".yml")
+
+
+def _from_file(path):
+    from oshinko_temaki import serializers
+
+    with open(path) as infile:
+        profile = serializers.load_yaml(infile)
+    if (not isinstance(profile, dict) or
+            not isinstance(profile.get("sparkconfigs"), dict)):
+        raise ValueError("profile {} must have a sparkconfigs "
+                         "mapping".format(path))
+    return profile
+
+
+def find_profile(name, profile_dir=None):
+    """return a profile by file path, by name in a directory or built in
+
+    a profile file can extend another profile by name, its sparkconfigs
+    are then merged over those of the profile it extends.
+    """
+    return _find(name, profile_dir, ())
+
+
+def _find(name, profile_dir, seen):
+    if name in seen:
+        raise ValueError("profile {} extends itself".format(name))
+
+    profile = None
+    if os.path.isfile(name):
+        profile = _from_file(name)
+    elif profile_dir is not None:
+        for extension in PROFILE_EXTENSIONS:
+            path = os.path.join(profile_dir, name + extension)
+            if os.path.isfile(path):
+                profile = _from_file(path)
+                break
+    if profile is None:
+        try:
+            profile = PROFILES[name]
+        except KeyError:
+            raise ValueError("unknown profile {}".format(name))
+
+    base = profile.get("extends")
+    if base is None:
+        return profile
+    parent = _find(base, profile_dir, seen + (name,))
+    return dict(profile, sparkconfigs=dict(parent["sparkconfigs"],
+                                           **profile["sparkconfigs"]))
+
+
+def _format(value):
+    # yaml files turn true and false into booleans, spark wants them back
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def expand(name, profile_dir=None):
+    """return the "KEY=VALUE" spark configs of a profile"""
+    profile = find_profile(name, profile_dir)
+    return ["{}={}".format(key, _format(value))
+            for key, value in profile["sparkconfigs"].items()]
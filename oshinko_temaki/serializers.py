@@ -0,0 +1,76 @@
+"""serializer backends for the rendered documents"""
+import json
+
+
+class Serializer():
+    """a base for turning template data into text"""
+    name = None
+
+    def dumps(self, data):
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    """json with the standard library spacing"""
+    name = "json"
+
+    def dumps(self, data):
+        return json.dumps(data)
+
+
+class CompactJSONSerializer(Serializer):
+    """json without any optional whitespace"""
+    name = "compact-json"
+
+    def dumps(self, data):
+        return json.dumps(data, separators=(",", ":"))
+
+
+class YAMLSerializer(Serializer):
+    """block style yaml, using libyaml when it is available
+
+    the dumper is resolved on first use so that PyYAML is not imported
+    until something is actually serialized to yaml.
+    """
+    name = "yaml"
+
+    def __init__(self):
+        self._dumper = None
+
+    def dumps(self, data):
+        if self._dumper is None:
+            self._dumper = yaml_dumper()
+        import yaml
+        return yaml.dump(data, Dumper=self._dumper, default_flow_style=False)
+
+
+def yaml_dumper():
+    """return the fastest safe yaml dumper class"""
+    import yaml
+    return getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def yaml_loader():
+    """return the fastest safe yaml loader class"""
+    import yaml
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(stream):
+    """parse a single yaml document from a string or file"""
+    import yaml
+    return yaml.load(stream, Loader=yaml_loader())
+
+
+SERIALIZERS = {
+    serializer.name: serializer()
+    for serializer in (JSONSerializer, CompactJSONSerializer, YAMLSerializer)
+}
+
+
+def get_serializer(name):
+    """return the serializer registered for an encoding name"""
+    try:
+        return SERIALIZERS[name]
+    except KeyError:
+        raise ValueError("unknown encoding {}".format(name))
@@ -0,0 +1,271 @@
+"""derive worker counts and executor settings from node capacity"""
+import collections
+import math
+import re
+
+
+MIB = 1024 * 1024
+UNITS = {
+    "": 1, "b": 1,
+    "k": 1024, "kb": 1024, "ki": 1024,
+    "m": MIB, "mb": MIB, "mi": MIB,
+    "g": 1024 * MIB, "gb": 1024 * MIB, "gi": 1024 * MIB,
+    "t": 1024 * 1024 * MIB, "tb": 1024 * 1024 * MIB, "ti": 1024 * 1024 * MIB,
+}
+# kubernetes quantities, their suffixes are case sensitive and M or G are
+# decimal units unlike in spark
+QUANTITY = re.compile(r"^([+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+))"
+                      r"((?:[KMGTPE]i)|[numkMGTPE]|(?:[eE][+-]?[0-9]+))?$")
+QUANTITY_UNITS = {
+    "": 1, "n": 1e-9, "u": 1e-6, "m": 1e-3,
+    "k": 10 ** 3, "M": 10 ** 6, "G": 10 ** 9, "T": 10 ** 12, "P": 10 ** 15,
+    "E": 10 ** 18,
+    "Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40, "Pi": 2 ** 50,
+    "Ei": 2 ** 60,
+}
+
+# capacity kept back on every node for the os and the spark worker daemon
+RESERVED_CORES = 1
+RESERVED_MEMORY = 1024 * MIB
+# more than about five concurrent tasks per executor hurts io throughput
+MAX_EXECUTOR_CORES = 5
+# spark adds max(384MiB, 10%) of off heap overhead to every executor
+MIN_OVERHEAD = 384 * MIB
+OVERHEAD_FRACTION = 0.10
+PARTITION_SIZE = 128 * MIB
+TASKS_PER_CORE = 3
+
+
+Sizing = collections.namedtuple("Sizing", "workers sparkconfigs explanation")
+
+
+def parse_memory(text):
+    """convert a size such as 4g, 512Mi or 1.5GB to bytes"""
+    value = str(text).strip().lower()
+    number = value.rstrip("abcdefghijklmnopqrstuvwxyz")
+    unit = value[len(number):]
+    if unit not in UNITS or not number:
+        raise ValueError("invalid memory size {}".format(text))
+    return int(float(number) * UNITS[unit])
+
+
+def spark_memory(size):
+    """format a size in bytes the way spark configs expect it"""
+    mib = size // MIB
+    if mib % 1024 == 0:
+        return "{}g".format(mib // 1024)
+    return "{}m".format(mib)
+
+
+def size_cluster(node_cpus, node_memory, input_size=None, parallelism=None,
+                 executor_cores=None, executor_memory=None,
+                 executor_overhead=None):
+    """compute the workers and executor configs for a workload
+
+    every worker pod is given the capacity of one node. node_memory and
+    input_size accept the same sizes as parse_memory, parallelism is the
+    number of tasks that should run at the same time.
+
+    executor_cores, executor_memory and executor_overhead fix those
+    settings, as spark would read them, and the rest is sized around
+    them. a ValueError is raised when they do not fit on a node.
+    """
+    if node_cpus <= RESERVED_CORES:
+        raise ValueError("nodes need at least {} cpus, {} of them are "
+                         "reserved for the os and the spark worker, got "
+                         "{}".format(RESERVED_CORES + 1, RESERVED_CORES,
+                                     node_cpus))
+    memory = parse_memory(node_memory)
+    explanation = []
+
+    usable_cores = node_cpus - RESERVED_CORES
+    if executor_cores is None:
+        executor_cores = min(MAX_EXECUTOR_CORES, usable_cores)
+    elif not 1 <= executor_cores <= usable_cores:
+        raise ValueError("spark.executor.cores={} does not fit the {} "
+                         "usable cores of a node".format(executor_cores,
+                                                         usable_cores))
+    executors = usable_cores // executor_cores
+    explanation.append(
+        "{} cpus per node - {} reserved = {} usable cores, {} cores per "
+        "executor gives {} executor(s) per worker".format(
+            node_cpus, RESERVED_CORES, usable_cores, executor_cores,
+            executors))
+
+    usable_memory = memory - RESERVED_MEMORY
+    if executor_memory is None:
+        if executor_overhead is None:
+            overhead = MIN_OVERHEAD
+        else:
+            overhead = _spark_memory_config(executor_overhead)
+        if usable_memory < executors * (overhead + MIN_OVERHEAD):
+            raise ValueError("{} of node memory is too small to run {} "
+                             "executor(s)".format(node_memory, executors))
+        per_executor = usable_memory // executors
+        if executor_overhead is None:
+            overhead = max(MIN_OVERHEAD,
+                           int(per_executor * OVERHEAD_FRACTION /
+                               (1 + OVERHEAD_FRACTION)))
+        heap = (per_executor - overhead) // MIB * MIB
+        if executor_overhead is None:
+            overhead = (per_executor - heap) // MIB * MIB
+    else:
+        heap = _spark_memory_config(executor_memory)
+        if executor_overhead is None:
+            overhead = max(MIN_OVERHEAD, int(heap * OVERHEAD_FRACTION))
+        else:
+            overhead = _spark_memory_config(executor_overhead)
+        per_executor = heap + overhead
+        fitting = usable_memory // per_executor
+        if fitting < 1:
+            raise ValueError(
+                "an executor of {} heap and {} overhead does not fit the {} "
+                "usable memory of a node".format(
+                    spark_memory(heap), spark_memory(overhead),
+                    spark_memory(usable_memory)))
+        if fitting < executors:
+            explanation.append(
+                "the memory of a node only holds {} of the {} executors"
+                .format(fitting, executors))
+            executors = fitting
+    explanation.append(
+        "{} node memory - {} reserved = {} usable, {} per executor split "
+        "into {} heap and {} overhead".format(
+            spark_memory(memory), spark_memory(RESERVED_MEMORY),
+            spark_memory(usable_memory), spark_memory(per_executor),
+            spark_memory(heap), spark_memory(overhead)))
+
+    partitions = 1
+    if input_size is not None:
+        partitions = max(1, math.ceil(parse_memory(input_size) /
+                                      PARTITION_SIZE))
+        explanation.append(
+            "{} input / {} per partition = {} partitions".format(
+                input_size, spark_memory(PARTITION_SIZE), partitions))
+
+    if parallelism is not None:
+        cores = parallelism
+        explanation.append("target parallelism asks for {} cores".format(
+            cores))
+    else:
+        cores = max(1, math.ceil(partitions / TASKS_PER_CORE))
+        explanation.append(
+            "{} partitions / {} tasks per core = {} cores".format(
+                partitions, TASKS_PER_CORE, cores))
+
+    cores_per_worker = executors * executor_cores
+    workers = max(1, math.ceil(cores / cores_per_worker))
+    total_cores = workers * cores_per_worker
+    explanation.append(
+        "{} cores / {} cores per worker = {} worker(s), {} cores in "
+        "total".format(cores, cores_per_worker, workers, total_cores))
+
+    shuffle = max(partitions, total_cores * TASKS_PER_CORE)
+    explanation.append(
+        "max({} partitions, {} cores * {} tasks per core) = {} shuffle "
+        "partitions".format(partitions, total_cores, TASKS_PER_CORE,
+                            shuffle))
+
+    sparkconfigs = [
+        "spark.executor.cores={}".format(executor_cores),
+        "spark.executor.memory={}".format(spark_memory(heap)),
+        "spark.executor.memoryOverhead={}".format(spark_memory(overhead)),
+        "spark.default.parallelism={}".format(shuffle),
+        "spark.sql.shuffle.partitions={}".format(shuffle),
+    ]
+    return Sizing(workers, sparkconfigs, explanation)
+
+
+def parse_quantity(text):
+    """convert a kubernetes quantity such as 500m, 4G or 512Mi to a number"""
+    match = QUANTITY.match(str(text).strip())
+    if match is None:
+        raise ValueError("invalid kubernetes quantity {}".format(text))
+    number, suffix = match.groups()
+    suffix = suffix or ""
+    if suffix[:1] in ("e", "E") and len(suffix) > 1:
+        return float(number + suffix)
+    return float(number) * QUANTITY_UNITS[suffix]
+
+
+def parse_cpu(text):
+    """convert a kubernetes cpu quantity such as 2 or 500m to cores"""
+    return parse_quantity(text)
+
+
+def _spark_memory_config(value):
+    # spark reads memory settings without a unit as mebibytes
+    if str(value).strip().isdigit():
+        return int(value) * MIB
+    return parse_memory(value)
+
+
+def executor_footprint(spec):
+    """return the memory of the executors on one worker of a spec
+
+    this is the heap plus overhead of every executor the worker can hold,
+    or None when the spec does not set spark.executor.memory.
+    """
+    configs = dict(spec.sparkconfigs or ())
+    if "spark.executor.memory" not in configs:
+        return None
+
+    heap = _spark_memory_config(configs["spark.executor.memory"])
+    if "spark.executor.memoryOverhead" in configs:
+        overhead = _spark_memory_config(
+            configs["spark.executor.memoryOverhead"])
+    else:
+        overhead = max(MIN_OVERHEAD, int(heap * OVERHEAD_FRACTION))
+
+    executors = 1
+    cpus = spec.worker_cpu_limit or spec.worker_cpu_request
+    if cpus is not None and "spark.executor.cores" in configs:
+        cores = int(configs["spark.executor.cores"])
+        if cores < 1:
+            raise ValueError("spark.executor.cores must be at least 1, got "
+                             "{}".format(cores))
+        executors = max(1, int(parse_cpu(cpus) // cores))
+    return executors * (heap + overhead)
+
+
+def worker_memory(spec):
+    """return the memory budget of a worker, its limit or else request"""
+    budget = spec.worker_memory_limit or spec.worker_memory_request
+    if budget is None:
+        return None
+    return int(parse_quantity(budget))
+
+
+def scratch_memory(spec):
+    """return the memory a tmpfs scratch volume can take from a worker
+
+    files on a memory backed emptyDir count against the memory limit of
+    the pod, scratch on disk or a claim takes none.
+    """
+    if spec.scratch != "memory" or spec.scratch_size is None:
+        return 0
+    return int(parse_quantity(spec.scratch_size))
+
+
+def check_executor_fit(spec):
+    """raise ValueError if the executors and tmpfs scratch overflow a worker"""
+    budget = worker_memory(spec)
+    footprint = executor_footprint(spec)
+    scratch = scratch_memory(spec)
+    if budget is None or (footprint is None and not scratch):
+        return
+    if (footprint or 0) + scratch <= budget:
+        return
+    if not scratch:
+        raise ValueError(
+            "executors need {} with overhead but the worker memory is "
+            "only {}".format(spark_memory(footprint), spark_memory(budget)))
+    if footprint is None:
+        raise ValueError(
+            "the memory scratch volume needs {} but the worker memory is "
+            "only {}".format(spark_memory(scratch), spark_memory(budget)))
+    raise ValueError(
+        "executors need {} with overhead and the memory scratch volume {}, "
+        "{} in total, but the worker memory is only {}".format(
+            spark_memory(footprint), spark_memory(scratch),
+            spark_memory(footprint + scratch), spark_memory(budget)))
@@ -0,0 +1,150 @@
+"""parameter sweeps over cluster definitions
+
+a sweep is a list of axes, each one a parameter and the values to try
+for it. every combination of the values, or a sampled subset of them,
+becomes a cluster definition that can be rendered like the clusters of
+a manifest. the parameters can be masters, workers, image or any spark
+configuration key.
+
+each cluster is named after the sweep and the index of its combination,
+so the same sweep always produces the same names. the coordinates are
+kept on the documents as annotations, and as labels as well when the
+values are valid label values, so results can be joined back to the
+configuration that produced them.
+"""
+import collections
+import random
+import re
+
+from oshinko_temaki import configs
+from oshinko_temaki import validation
+
+
+PREFIX = "sweep.osht.io/"
+SWEPT_FIELDS = ("masters", "workers", "image")
+RANGE = re.compile(r"^(-?\d+)\.\.(-?\d+)(?::(\d+))?$")
+LABEL_KEY = re.compile(validation.METADATA_KEY["pattern"])
+LABEL_VALUE = re.compile(validation.LABEL_VALUE["pattern"])
+
+
+class Axis(collections.namedtuple("Axis", "param values")):
+    """a parameter of a sweep and the values it takes"""
+    __slots__ = ()
+
+    @classmethod
+    def parse(cls, text):
+        """create an axis from "PARAM=A,B,C" or "PARAM=START..STOP[:STEP]"
+
+        ranges include the stop value.
+        """
+        param, _, values = text.partition("=")
+        if not param or not values:
+            raise ValueError("invalid sweep {!r}, expected PARAM=VALUES"
+                             .format(text))
+        if param not in SWEPT_FIELDS and "." not in param:
+            raise ValueError(
+                "unknown sweep parameter {}, expected one of {} or a spark "
+                "configuration key".format(param, ", ".join(SWEPT_FIELDS)))
+
+        match = RANGE.match(values)
+        if match is not None:
+            start, stop, step = match.groups()
+            values = [str(value) for value
+                      in range(int(start), int(stop) + 1, int(step or 1))]
+            if not values:
+                raise ValueError("empty sweep range {!r}".format(text))
+        else:
+            values = values.split(",")
+
+        if param in configs.INT_FIELDS:
+            try:
+                values = [int(value) for value in values]
+            except ValueError:
+                raise ValueError("sweep values of {} must be integers"
+                                 .format(param))
+        return cls(param, tuple(values))
+
+
+def parse_axes(texts):
+    """parse a list of sweep strings, each parameter can be given once"""
+    axes = [Axis.parse(text) for text in texts]
+    params = [axis.param for axis in axes]
+    for param in params:
+        if params.count(param) > 1:
+            raise ValueError("sweep parameter {} given more than once"
+                             .format(param))
+    return axes
+
+
+def size(axes):
+    """return the number of combinations of the axes"""
+    total = 1
+    for axis in axes:
+        total *= len(axis.values)
+    return total
+
+
+def point(axes, index):
+    """return the values at an index of the cartesian product of the axes
+
+    the order is the one of itertools.product, the last axis changes
+    fastest.
+    """
+    values = []
+    for axis in reversed(axes):
+        index, offset = divmod(index, len(axis.values))
+        values.append(axis.values[offset])
+    return tuple(reversed(values))
+
+
+def points(axes, sample=None, seed=0):
+    """generate the (index, values) of every combination, in order
+
+    with sample only that many combinations are picked at random, the
+    same seed always picks the same ones. the combinations are computed
+    from their index, the product is never built in memory.
+    """
+    total = size(axes)
+    if sample is None or sample >= total:
+        indexes = range(total)
+    else:
+        indexes = sorted(random.Random(seed).sample(range(total), sample))
+    for index in indexes:
+        yield index, point(axes, index)
+
+
+def definitions(axes, base=None, name=None, sample=None, seed=0):
+    """generate the cluster definition of every combination of a sweep
+
+    the values of base are used for the fields the sweep does not set,
+    swept spark configuration keys win over the ones in base. without a
+    name the sweep is named after its axes.
+    """
+    base = base or {}
+    if name is None:
+        name = configs.stable_name({"sweep": [list(axis) for axis in axes]})
+
+    for index, values in points(axes, sample, seed):
+        definition = dict(base)
+        sparkconfigs = []
+        labels = [PREFIX + "id=" + name, PREFIX + "point=" + str(index)]
+        annotations = []
+        for axis, value in zip(axes, values):
+            if axis.param in SWEPT_FIELDS:
+                definition[axis.param] = value
+            else:
+                sparkconfigs.append("{}={}".format(axis.param, value))
+            key = PREFIX + axis.param
+            annotations.append("{}={}".format(key, value))
+            if (LABEL_KEY.match(key) and LABEL_VALUE.match(str(value)) and
+                    len(str(value)) <= validation.LABEL_VALUE["maxLength"]):
+                labels.append("{}={}".format(key, value))
+
+        if sparkconfigs:
+            definition["sparkconfigs"] = configs.merge_pairs(
+                base.get("sparkconfigs"), sparkconfigs)
+        definition["labels"] = configs.merge_pairs(base.get("labels"), labels)
+        definition["annotations"] = configs.merge_pairs(
+            base.get("annotations"), annotations)
+        definition["name"] = "{}-{}".format(name, index)
+        yield definition
@@ -1,53 +1,92 @@
-import json
+from oshinko_temaki import configs
+from oshinko_temaki import instrument
+from oshinko_temaki import serializers
 
-import yaml
+
+def _spec_field(name):
+    return property(lambda self: getattr(self.spec, name),
+                    doc="the {} of the cluster spec".format(name))
+
+
+def _entries_field(name):
+    def entries(self):
+        values = getattr(self.spec, name)
+        if values is None:
+            return None
+        return [value.to_dict() for value in values]
+    return property(entries,
+                    doc="the {} of the cluster spec as dicts".format(name))
 
 
 class BaseTemplate():
     def __init__(self, config):
-        self.name = config.name
-        self.masters = config.masters
-        self.workers = config.workers
-        self.image = config.image
-        self.metrics = config.metrics
-        self.webui = config.webui
-        self.configmap = config.configmap
-
-        # setup env variables so they are easier to process
-        if config.envs is None:
-            self.envs = None
-        else:
-            self.envs = [] 
-            for env in config.envs:
-                key, value = env.split("=", 1)
-                self.envs.append({ "name": key, "value": value })
-
-        # setup spark config variables so they are easier to process
-        if config.sparkconfigs is None:
-            self.sparkconfigs = None
-        else:
-            self.sparkconfigs = [] 
-            for conf in config.sparkconfigs:
-                key, value = conf.split("=", 1)
-                self.sparkconfigs.append({ "name": key, "value": value })
-
-        # setup download data targets so they are easier to process
-        if config.downloads is None:
-            self.downloads = None
-        else:
-            self.downloads = [] 
-            for dl in config.downloads:
-                key, value = dl.split("::", 1)
-                self.downloads.append({ "url": key, "to": value })
-
-    def dumps(self):
-        return json.dumps(self._data)
+        # a ClusterSpec is used as is, configs and parsed arguments are
+        # converted once. the fields below only read from the spec
+        self.spec = configs.ClusterSpec.from_args(config)
+
+    name = _spec_field("name")
+    masters = _spec_field("masters")
+    workers = _spec_field("workers")
+    image = _spec_field("image")
+    metrics = _spec_field("metrics")
+    webui = _spec_field("webui")
+    configmap = _spec_field("configmap")
+    envs = _entries_field("envs")
+    sparkconfigs = _entries_field("sparkconfigs")
+    downloads = _entries_field("downloads")
+
+    # documents are rendered from the spec when they are needed instead of
+    # being kept on the template, unless they were given to from_data
+    _rendered = None
+
+    @classmethod
+    def from_data(cls, data, spec):
+        """create a template around already rendered data for a spec
+
+        the data is used as is and must be treated as read only, it may be
+        shared with other templates.
+        """
+        template = cls.__new__(cls)
+        template.spec = spec
+        template._rendered = data
+        return template
+
+    @property
+    def _data(self):
+        if self._rendered is not None:
+            return self._rendered
+        return self.render()
+
+    def render(self):
+        """build the document for the spec as plain data"""
+        raise NotImplementedError
+
+    def dumps(self, encoding="json"):
+        """serialize the template with one of the registered encodings"""
+        with instrument.stage("render"):
+            data = self._data
+        with instrument.stage("serialize"):
+            document = serializers.get_serializer(encoding).dumps(data)
+        instrument.document(document)
+        return document
+
+    def metadata(self, **labels):
+        """build the metadata of the document, extra labels come first"""
+        metadata = {"name": self.name}
+        spec_labels = self.spec.metadata("labels")
+        if spec_labels is not None:
+            labels.update(spec_labels)
+        if labels:
+            metadata["labels"] = labels
+        annotations = self.spec.metadata("annotations")
+        if annotations:
+            metadata["annotations"] = annotations
+        return metadata
 
 
 class CMTemplate(BaseTemplate):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
+    def config_data(self):
+        """build the cluster config the ConfigMap embeds, as plain data"""
         data = {
             "master": {
                 "instances": self.masters
@@ -56,6 +95,9 @@ class CMTemplate(BaseTemplate):
                 "instances": self.workers
             }
         }
+        data["master"].update(self.spec.resources("master"))
+        data["worker"].update(self.spec.resources("worker"))
+        data["worker"].update(self.spec.volumes("worker"))
 
         if self.image is not None:
             data["customImage"] = self.image
@@ -78,31 +120,32 @@ class CMTemplate(BaseTemplate):
         if self.downloads is not None:
             data["downloadData"] = self.downloads
 
-        self._data = {
+        return data
+
+    def render(self):
+        return self.wrap(serializers.get_serializer("yaml").dumps(
+            self.config_data()))
+
+    def wrap(self, config):
+        """build the ConfigMap around an already serialized config"""
+        return {
             "apiVersion": "v1",
             "kind": "ConfigMap",
-            "metadata": {
-                "name": self.name,
-                "labels": {
-                    "radanalytics.io/kind": "SparkCluster"
-                }
-            },
+            "metadata": self.metadata(**{
+                "radanalytics.io/kind": "SparkCluster"
+            }),
             "data": {
-                "config": yaml.dump(data)
+                "config": config
             }
         }
 
 
 class CRDTemplate(BaseTemplate):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        self._data = {
+    def render(self):
+        data = {
             "apiVersion": "radanalytics.io/v1",
             "kind": "SparkCluster",
-            "metadata": {
-                "name": self.name
-            },
+            "metadata": self.metadata(),
             "spec": {
                 "master": {
                     "instances": int(self.masters)
@@ -112,24 +155,29 @@ class CRDTemplate(BaseTemplate):
                 }
             }
         }
+        data["spec"]["master"].update(self.spec.resources("master"))
+        data["spec"]["worker"].update(self.spec.resources("worker"))
+        data["spec"]["worker"].update(self.spec.volumes("worker"))
 
         if self.image is not None:
-            self._data["spec"]["customImage"] = self.image
+            data["spec"]["customImage"] = self.image
 
         if self.metrics is True:
-            self._data["spec"]["metrics"] = True
+            data["spec"]["metrics"] = True
 
         if self.webui is True:
-            self._data["spec"]["sparkWebUI"] = True
+            data["spec"]["sparkWebUI"] = True
 
         if self.configmap is not None:
-            self._data["spec"]["sparkConfigurationMap"] = self.configmap
+            data["spec"]["sparkConfigurationMap"] = self.configmap
 
         if self.envs is not None:
-            self._data["spec"]["env"] = self.envs
-        
+            data["spec"]["env"] = self.envs
+
         if self.sparkconfigs is not None:
-            self._data["spec"]["sparkConfiguration"] = self.sparkconfigs
+            data["spec"]["sparkConfiguration"] = self.sparkconfigs
 
         if self.downloads is not None:
-            self._data["spec"]["downloadData"] = self.downloads
+            data["spec"]["downloadData"] = self.downloads
+
+        return data
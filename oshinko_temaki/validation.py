@@ -0,0 +1,313 @@
+"""schema validation of rendered SparkCluster documents
+
+the schemas are a small subset of json schema (type, properties,
+required, additionalProperties, propertyNames, items, enum, pattern,
+minimum and maxLength). each schema is compiled once into nested
+checking functions, so validating a document is a walk over its data with
+no further interpretation of the schema. validators collect every error
+instead of stopping at the first one.
+"""
+import functools
+import re
+
+from oshinko_temaki import configs
+from oshinko_temaki import instrument
+from oshinko_temaki import sizing
+from oshinko_temaki import templates
+
+
+NAME_PATTERN = r"^[a-z0-9]([-.a-z0-9]*[a-z0-9])?$"
+ENV_NAME_PATTERN = r"^[-._a-zA-Z][-._a-zA-Z0-9]*$"
+QUANTITY = {"type": "string", "pattern": sizing.QUANTITY.pattern}
+# an optional dns subdomain prefix and a name of up to 63 characters
+METADATA_KEY = {
+    "type": "string",
+    "pattern": r"^([a-z0-9]([-.a-z0-9]*[a-z0-9])?/)?"
+               r"[A-Za-z0-9]([-A-Za-z0-9_.]{0,61}[A-Za-z0-9])?$",
+}
+LABEL_VALUE = {
+    "type": "string",
+    "pattern": r"^(([A-Za-z0-9][-A-Za-z0-9_.]*)?[A-Za-z0-9])?$",
+    "maxLength": 63,
+}
+
+
+def _pairs(first, second, first_pattern=None):
+    first_schema = {"type": "string"}
+    if first_pattern is not None:
+        first_schema["pattern"] = first_pattern
+    return {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "required": [first, second],
+            "additionalProperties": False,
+            "properties": {first: first_schema, second: {"type": "string"}},
+        },
+    }
+
+
+def _role(minimum):
+    # scratch volumes are only checked as deep as the names that match
+    # them to their mounts, kubernetes checks the volume sources
+    volumes = {
+        "type": "array",
+        "items": {"type": "object", "required": ["name"]},
+    }
+    return {
+        "type": "object",
+        "required": ["instances"],
+        "additionalProperties": False,
+        "properties": {
+            "instances": {"type": "integer", "minimum": minimum},
+            "cpuRequest": QUANTITY,
+            "cpuLimit": QUANTITY,
+            "memoryRequest": QUANTITY,
+            "memoryLimit": QUANTITY,
+            "volumes": volumes,
+            "volumeMounts": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "required": ["name", "mountPath"],
+                    "properties": {"name": {"type": "string"},
+                                   "mountPath": {"type": "string"}},
+                },
+            },
+        },
+    }
+
+
+CLUSTER_SPEC = {
+    "type": "object",
+    "required": ["master", "worker"],
+    "properties": {
+        "master": _role(1),
+        "worker": _role(0),
+        "customImage": {"type": "string"},
+        "metrics": {"type": "boolean"},
+        "sparkWebUI": {"type": "boolean"},
+        "sparkConfigurationMap": {"type": "string"},
+        "env": _pairs("name", "value", ENV_NAME_PATTERN),
+        "sparkConfiguration": _pairs("name", "value"),
+        "downloadData": _pairs("url", "to"),
+    },
+}
+METADATA = {
+    "type": "object",
+    "required": ["name"],
+    "properties": {
+        "name": {"type": "string", "pattern": NAME_PATTERN,
+                 "maxLength": 253},
+        "labels": {"type": "object", "propertyNames": METADATA_KEY,
+                   "additionalProperties": LABEL_VALUE},
+        "annotations": {"type": "object", "propertyNames": METADATA_KEY,
+                        "additionalProperties": {"type": "string"}},
+    },
+}
+
+SCHEMAS = {
+    "SparkCluster": {
+        "type": "object",
+        "required": ["apiVersion", "kind", "metadata", "spec"],
+        "properties": {
+            "apiVersion": {"enum": ["radanalytics.io/v1"]},
+            "kind": {"enum": ["SparkCluster"]},
+            "metadata": METADATA,
+            "spec": CLUSTER_SPEC,
+        },
+    },
+    "ConfigMap": {
+        "type": "object",
+        "required": ["apiVersion", "kind", "metadata", "data"],
+        "properties": {
+            "apiVersion": {"enum": ["v1"]},
+            "kind": {"enum": ["ConfigMap"]},
+            "metadata": METADATA,
+            "data": {
+                "type": "object",
+                "required": ["config"],
+                "properties": {"config": {"type": "string"}},
+            },
+        },
+    },
+    # the cluster config that a ConfigMap embeds as yaml
+    "ConfigMapConfig": CLUSTER_SPEC,
+}
+
+TYPES = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: (isinstance(value, int) and
+                              not isinstance(value, bool)),
+    "boolean": lambda value: isinstance(value, bool),
+}
+
+
+def compile_schema(schema):
+    """turn a schema into a function(value, path, errors)"""
+    checks = []
+
+    if "type" in schema:
+        type_name = schema["type"]
+        type_check = TYPES[type_name]
+
+        def check_type(value, path, errors):
+            if not type_check(value):
+                errors.append((path, "expected {}, got {!r}".format(
+                    type_name, value)))
+                return False
+            return True
+    else:
+        def check_type(value, path, errors):
+            return True
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append((path, "expected one of {}, got {!r}".format(
+                    ", ".join(map(str, allowed)), value)))
+        checks.append(check_enum)
+
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+
+        def check_pattern(value, path, errors):
+            if not pattern.match(value):
+                errors.append((path, "{!r} does not match {}".format(
+                    value, pattern.pattern)))
+        checks.append(check_pattern)
+
+    if "maxLength" in schema:
+        max_length = schema["maxLength"]
+
+        def check_length(value, path, errors):
+            if len(value) > max_length:
+                errors.append((path, "longer than {} characters".format(
+                    max_length)))
+        checks.append(check_length)
+
+    if "minimum" in schema:
+        minimum = schema["minimum"]
+
+        def check_minimum(value, path, errors):
+            if value < minimum:
+                errors.append((path, "{} is less than {}".format(
+                    value, minimum)))
+        checks.append(check_minimum)
+
+    if "required" in schema:
+        required = schema["required"]
+
+        def check_required(value, path, errors):
+            for key in required:
+                if key not in value:
+                    errors.append((path, "missing {}".format(key)))
+        checks.append(check_required)
+
+    if "propertyNames" in schema:
+        check_name = compile_schema(schema["propertyNames"])
+
+        def check_names(value, path, errors):
+            for key in value:
+                check_name(key, "{}.{}".format(path, key), errors)
+        checks.append(check_names)
+
+    if "properties" in schema or "additionalProperties" in schema:
+        properties = {key: compile_schema(subschema) for key, subschema
+                      in schema.get("properties", {}).items()}
+        additional = schema.get("additionalProperties", True)
+        closed = additional is False
+        check_additional = (None if isinstance(additional, bool)
+                            else compile_schema(additional))
+
+        def check_properties(value, path, errors):
+            for key, item in value.items():
+                check = properties.get(key, check_additional)
+                if check is not None:
+                    check(item, "{}.{}".format(path, key), errors)
+                elif closed:
+                    errors.append((path, "unexpected field {}".format(key)))
+        checks.append(check_properties)
+
+    if "items" in schema:
+        check_item = compile_schema(schema["items"])
+
+        def check_items(value, path, errors):
+            for index, item in enumerate(value):
+                check_item(item, "{}[{}]".format(path, index), errors)
+        checks.append(check_items)
+
+    def validate(value, path, errors):
+        if check_type(value, path, errors):
+            for check in checks:
+                check(value, path, errors)
+    return validate
+
+
+@functools.lru_cache(maxsize=None)
+def validator(kind):
+    """return the compiled validator for a document kind, compiled once"""
+    try:
+        return compile_schema(SCHEMAS[kind])
+    except KeyError:
+        raise ValueError("no schema for documents of kind {}".format(kind))
+
+
+def validate_template(template):
+    """return a list of (path, message) errors for a template"""
+    errors = []
+    if isinstance(template, templates.CMTemplate):
+        # the embedded config is checked as data, serializing it to yaml
+        # for the check would cost more than the check itself
+        validator("ConfigMap")(template.wrap(""), "", errors)
+        validator("ConfigMapConfig")(template.config_data(), ".data.config",
+                                     errors)
+    else:
+        data = template._data
+        validator(data.get("kind"))(data, "", errors)
+    return errors
+
+
+def validate_definition(definition, output="cr"):
+    """return a list of (path, message) errors for a cluster definition
+
+    a definition that cannot be turned into a spec, such as an env without
+    a "=", is reported as a single error instead of raising.
+    """
+    try:
+        spec = configs.ClusterSpec.from_dict(definition)
+    except ValueError as exc:
+        return [("", str(exc))]
+    template_class = (templates.CRDTemplate if output == "cr"
+                      else templates.CMTemplate)
+    return validate_template(template_class(spec))
+
+
+class ValidationError(ValueError):
+    """raised with the errors of every invalid document at once
+
+    problems is a list of (label, path, message) tuples.
+    """
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("\n".join(
+            "{}: {}{}".format(label, path + ": " if path else "", message)
+            for label, path, message in problems))
+
+
+def check_all(definitions, output="cr"):
+    """validate every definition, raising a ValidationError for all errors"""
+    problems = []
+    with instrument.stage("validate"):
+        for index, definition in enumerate(definitions):
+            errors = validate_definition(definition, output)
+            if errors:
+                label = "cluster {}".format(definition.get("name", index))
+                problems.extend((label, path, message)
+                                for path, message in errors)
+    if problems:
+        raise ValidationError(problems)
@@ -0,0 +1,99 @@
+"""streaming writers for multi-document output"""
+from oshinko_temaki import instrument
+
+
+class StreamWriter():
+    """a base for writers that emit each document as it arrives
+
+    documents are written straight to the stream, nothing is held back
+    between calls to write, so memory use does not grow with the number
+    of documents. when used as a context manager the output is only
+    finished if no exception was raised, a failed run must not look like
+    a complete one.
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.stream.flush()
+
+    def write(self, document):
+        """write a serialized document or a template"""
+        if not isinstance(document, str):
+            document = document.dumps()
+        with instrument.stage("write"):
+            self._write(document)
+        self.count += 1
+
+    def close(self):
+        """finish the output, this does not close the stream"""
+        self.stream.flush()
+
+    def _write(self, document):
+        raise NotImplementedError
+
+
+class YAMLStreamWriter(StreamWriter):
+    """write documents as a --- separated yaml stream"""
+    def _write(self, document):
+        self.stream.write("---\n")
+        self.stream.write(document)
+        if not document.endswith("\n"):
+            self.stream.write("\n")
+
+
+class NDJSONWriter(StreamWriter):
+    """write documents as newline delimited json"""
+    def _write(self, document):
+        if "\n" in document:
+            raise ValueError("ndjson output requires single line documents")
+        self.stream.write(document)
+        self.stream.write("\n")
+
+
+class ListWriter(StreamWriter):
+    """write documents as the items of a kubernetes List"""
+    def _write(self, document):
+        if self.count == 0:
+            self.stream.write('{"apiVersion": "v1", "kind": "List", '
+                              '"items": [')
+        else:
+            self.stream.write(", ")
+        self.stream.write(document)
+
+    def close(self):
+        if self.count == 0:
+            self.stream.write('{"apiVersion": "v1", "kind": "List", '
+                              '"items": [')
+        self.stream.write("]}\n")
+        super().close()
+
+
+WRITERS = {
+    "yaml": YAMLStreamWriter,
+    "ndjson": NDJSONWriter,
+    "list": ListWriter,
+}
+
+
+def get_writer(name, stream):
+    """create the named writer for a stream"""
+    try:
+        return WRITERS[name](stream)
+    except KeyError:
+        raise ValueError("unknown output format {}".format(name))
+
+
+def write_documents(documents, stream, name="yaml"):
+    """write every document from an iterable, returning the count"""
+    with get_writer(name, stream) as writer:
+        for document in documents:
+            writer.write(document)
+    return writer.count
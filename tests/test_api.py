@@ -0,0 +1,87 @@
+import asyncio
+import json
+import unittest
+
+import oshinko_temaki
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+class TestRender(unittest.TestCase):
+    def test_keywords(self):
+        """test rendering from keyword arguments"""
+        document = json.loads(oshinko_temaki.render(name="test", workers=3))
+        self.assertEqual(document["metadata"]["name"], "test")
+        self.assertEqual(document["spec"]["worker"]["instances"], 3)
+
+    def test_matches_template(self):
+        """test that every input form gives the template output"""
+        spec = configs.ClusterSpec.create(name="test", envs=["A=b"])
+        expected = templates.CMTemplate(spec).dumps("yaml")
+        for value in (spec, {"name": "test", "envs": ["A=b"]}):
+            self.assertEqual(
+                oshinko_temaki.render(value, output="cm", encoding="yaml"),
+                expected)
+        self.assertEqual(oshinko_temaki.render(spec),
+                         templates.CRDTemplate(spec).dumps())
+
+    def test_plain_data(self):
+        """test that no encoding returns the document as data"""
+        data = oshinko_temaki.render({"name": "test"}, encoding=None,
+                                     workers=2)
+        self.assertEqual(data["spec"]["worker"]["instances"], 2)
+
+    def test_invalid(self):
+        """test that bad input raises a ValueError"""
+        spec = configs.ClusterSpec.create()
+        for args, kwargs in (((spec,), {"workers": 2}), (("test",), {}),
+                             ((), {"output": "pod"}),
+                             ((), {"unknown": 1})):
+            with self.assertRaises(ValueError):
+                oshinko_temaki.render(*args, **kwargs)
+
+    def test_render_many(self):
+        """test that render_many is lazy and applies the defaults"""
+        specs = iter([{"name": "a"}, {"name": "b", "workers": 5}])
+        documents = oshinko_temaki.render_many(specs, encoding=None,
+                                               workers=2)
+        self.assertEqual(next(documents)["spec"]["worker"]["instances"], 2)
+        self.assertEqual(next(specs, None), {"name": "b", "workers": 5})
+
+
+class TestRenderAsync(unittest.TestCase):
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def test_render_async(self):
+        """test awaiting a render"""
+        document = self.run_async(oshinko_temaki.render_async(name="test"))
+        self.assertEqual(document, oshinko_temaki.render(name="test"))
+
+    def test_render_many_async(self):
+        """test that other tasks run while many documents are rendered"""
+        ticks = []
+
+        async def ticker():
+            for _ in range(3):
+                ticks.append(len(documents))
+                await asyncio.sleep(0)
+
+        documents = []
+
+        async def collect():
+            async for document in oshinko_temaki.render_many_async(
+                    ({"name": "c{}".format(i)} for i in range(10)),
+                    every=2):
+                documents.append(document)
+
+        async def both():
+            await asyncio.gather(collect(), ticker())
+
+        self.run_async(both())
+        self.assertEqual(len(documents), 10)
+        self.assertLess(ticks[-1], 10)
@@ -0,0 +1,144 @@
+import argparse
+import http.server
+import json
+import socketserver
+import threading
+import unittest
+
+from oshinko_temaki import apply
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """a stand in for the SparkCluster and ConfigMap api endpoints"""
+    protocol_version = "HTTP/1.1"
+
+    def do_PATCH(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests.append((self.path, self.headers, body))
+            failing = server.failures > 0
+            if failing:
+                server.failures -= 1
+            conflict = server.conflicts and "force=true" not in self.path
+
+        path = self.path.split("?")[0]
+        known = (path.startswith("/apis/radanalytics.io/v1/namespaces/") and
+                 "/sparkclusters/" in path) or (
+                 path.startswith("/api/v1/namespaces/") and
+                 "/configmaps/" in path)
+        if failing:
+            status, payload = 503, b'{"reason": "unavailable"}'
+        elif conflict:
+            status, payload = 409, b'{"reason": "Conflict"}'
+        elif not known:
+            status, payload = 404, b'{"reason": "not found"}'
+        else:
+            status, payload = 200, body
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if failing:
+            self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class TestSubmitter(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.connections = set()
+        self.server.requests = []
+        self.server.failures = 0
+        self.server.conflicts = False
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+
+    @staticmethod
+    def documents(template_class, count):
+        return [template_class(configs.ClusterConfig(
+            argparse.Namespace(name="c{}".format(i)))).dumps()
+            for i in range(count)]
+
+    def test_apply_crs(self):
+        """test applying custom resources over reused connections"""
+        submitter = apply.Submitter(self.url, "spark", "secret",
+                                    concurrency=2)
+        results = list(submitter.apply(
+            self.documents(templates.CRDTemplate, 10)))
+        self.assertEqual([r.name for r in results],
+                         ["c{}".format(i) for i in range(10)])
+        self.assertTrue(all(r.status == 200 for r in results))
+        self.assertLessEqual(len(self.server.connections), 2)
+
+        path, headers, body = self.server.requests[0]
+        self.assertTrue(path.startswith(
+            "/apis/radanalytics.io/v1/namespaces/spark/sparkclusters/"))
+        self.assertIn("fieldManager=osht", path)
+        self.assertEqual(headers["Authorization"], "Bearer secret")
+        self.assertEqual(headers["Content-Type"],
+                         "application/apply-patch+yaml")
+        self.assertEqual(json.loads(body)["kind"], "SparkCluster")
+
+    def test_apply_configmap(self):
+        """test applying a ConfigMap"""
+        submitter = apply.Submitter(self.url)
+        results = list(submitter.apply(
+            self.documents(templates.CMTemplate, 1)))
+        self.assertEqual(results[0].status, 200)
+        self.assertTrue(self.server.requests[0][0].startswith(
+            "/api/v1/namespaces/default/configmaps/c0?"))
+
+    def test_retry(self):
+        """test that unavailable responses are retried"""
+        self.server.failures = 2
+        submitter = apply.Submitter(self.url, backoff=0)
+        result = submitter.submit(self.documents(templates.CRDTemplate, 1)[0])
+        self.assertEqual(result.status, 200)
+        self.assertEqual(result.attempts, 3)
+        self.assertIsNone(result.error)
+
+    def test_retries_exhausted(self):
+        """test that a request fails once the retries are used up"""
+        self.server.failures = 5
+        submitter = apply.Submitter(self.url, retries=1, backoff=0)
+        result = submitter.submit(self.documents(templates.CRDTemplate, 1)[0])
+        self.assertEqual(result.status, 503)
+        self.assertEqual(result.attempts, 2)
+        summary = apply.summarize([result])
+        self.assertEqual(summary["failed"], 1)
+
+    def test_conflicts(self):
+        """test that conflicts are reported unless forced"""
+        self.server.conflicts = True
+        document = self.documents(templates.CRDTemplate, 1)[0]
+        result = apply.Submitter(self.url).submit(document)
+        self.assertEqual(result.status, 409)
+        self.assertEqual(result.attempts, 1)
+        self.assertIn("--force-conflicts", result.error)
+        self.assertNotIn("force=true", self.server.requests[0][0])
+
+        result = apply.Submitter(self.url, force=True).submit(document)
+        self.assertEqual(result.status, 200)
+        self.assertIn("force=true", self.server.requests[1][0])
+
+    def test_unknown_kind(self):
+        """test that only SparkClusters and ConfigMaps are applied"""
+        submitter = apply.Submitter(self.url)
+        with self.assertRaises(ValueError):
+            submitter.submit('{"kind": "Pod", "metadata": {"name": "x"}}')
@@ -0,0 +1,147 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from oshinko_temaki import batch
+from oshinko_temaki import configs
+from oshinko_temaki import validation
+
+
+class TestBatch(unittest.TestCase):
+    def write_manifest(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "w") as outfile:
+            outfile.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_load_yaml(self):
+        """test reading a yaml manifest with a clusters key"""
+        path = self.write_manifest(".yaml", (
+            "clusters:\n"
+            "- name: one\n"
+            "  workers: 3\n"
+            "- name: two\n"
+            "  envs: [A=b]\n"))
+        observed = batch.load_manifest(path)
+        self.assertEqual(observed, [{"name": "one", "workers": 3},
+                                    {"name": "two", "envs": ["A=b"]}])
+
+    def test_load_json(self):
+        """test reading a json manifest with a top level list"""
+        path = self.write_manifest(".json", json.dumps(
+            [{"name": "one", "masters": "2", "metrics": "true"}]))
+        observed = batch.load_manifest(path)
+        self.assertEqual(observed,
+                         [{"name": "one", "masters": 2, "metrics": True}])
+
+    def test_load_csv(self):
+        """test reading a csv manifest with packed list fields"""
+        path = self.write_manifest(".csv", (
+            "name,workers,sparkconfigs\n"
+            "one,2,a=1;b=2\n"
+            "two,,\n"))
+        observed = batch.load_manifest(path)
+        self.assertEqual(observed, [
+            {"name": "one", "workers": 2, "sparkconfigs": ["a=1", "b=2"]},
+            {"name": "two"}])
+
+    def test_unknown_field(self):
+        """test that unknown cluster fields are rejected"""
+        with self.assertRaises(ValueError):
+            configs.normalize_definition({"name": "one", "wrokers": 2})
+
+    def test_wrong_types(self):
+        """test that fields of the wrong type are reported together"""
+        path = self.write_manifest(".yaml", (
+            "- name: one\n"
+            "  workers: [1]\n"
+            "- name: two\n"
+            "- envs: 5\n"
+            "  metrics: [true]\n"
+            "- image: {a: b}\n"))
+        with self.assertRaises(validation.ValidationError) as caught:
+            batch.load_manifest(path)
+        self.assertEqual(
+            [(label, message.split(":")[0])
+             for label, _, message in caught.exception.problems],
+            [("cluster one", "workers"), ("cluster 2", "envs"),
+             ("cluster 3", "image")])
+
+    def test_render_all_pool(self):
+        """test that a process pool renders the same documents in order"""
+        definitions = [{"name": "c{}".format(i), "workers": i}
+                       for i in range(1, 6)]
+        serial = list(batch.render_all(definitions))
+        pooled = list(batch.render_all(definitions, processes=2,
+                                       chunksize=2))
+        self.assertEqual(serial, pooled)
+        self.assertEqual(json.loads(serial[4])["spec"]["worker"]["instances"],
+                         5)
+
+    def test_generated_definitions(self):
+        """test that generated definitions are rendered in order"""
+        def definitions():
+            return ({"name": "c{}".format(i), "workers": i}
+                    for i in range(1, 21))
+
+        serial = list(batch.render_all(definitions()))
+        pooled = list(batch.render_all(definitions(), processes=2,
+                                       chunksize=1))
+        self.assertEqual(serial, pooled)
+
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        report = batch.write_directory(definitions(), output_dir,
+                                       processes=2)
+        self.assertEqual(len(report["added"]), 20)
+        with open(os.path.join(output_dir, "c7.json")) as infile:
+            self.assertEqual(json.load(infile)["spec"]["worker"]["instances"],
+                             7)
+
+    def test_run_defaults(self):
+        """test that defaults fill in fields missing from definitions"""
+        path = self.write_manifest(".json", json.dumps(
+            [{"name": "one"}, {"name": "two", "image": "other"}]))
+        stream = io.StringIO()
+        batch.run(path, {"image": "default"}, stream=stream)
+        documents = [json.loads(doc) for doc in
+                     stream.getvalue().split("---\n") if doc]
+        self.assertEqual([doc["spec"]["customImage"] for doc in documents],
+                         ["default", "other"])
+
+    def test_sync_stable_names(self):
+        """test that unnamed clusters get the same files on every run"""
+        path = self.write_manifest(".json", json.dumps(
+            [{"workers": 2}, {"workers": 3}]))
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+
+        first = batch.sync(path, {}, output_dir)
+        second = batch.sync(path, {}, output_dir)
+        self.assertEqual(len(first["added"]), 2)
+        self.assertEqual(second["unchanged"], 2)
+        self.assertEqual(second["added"] + second["changed"], [])
+
+    def test_sync_edit_unnamed(self):
+        """test that editing an unnamed cluster changes its file"""
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        path = self.write_manifest(".json", json.dumps(
+            [{"workers": 3}, {"workers": 3}]))
+        batch.sync(path, {}, output_dir)
+        with open(path, "w") as outfile:
+            json.dump([{"workers": 4}, {"workers": 3}], outfile)
+        report = batch.sync(path, {"image": "other"}, output_dir)
+        self.assertEqual(report["added"] + report["removed"], [])
+        self.assertEqual(len(report["changed"]), 2)
+
+    def test_manifest_stem(self):
+        """test the name prefix of unnamed clusters"""
+        self.assertEqual(batch.manifest_stem("/a/Team_Clusters.yaml"),
+                         "team-clusters")
+        self.assertEqual(batch.manifest_stem("-"), "spark")
+        self.assertEqual(batch.manifest_stem("__.csv"), "spark")
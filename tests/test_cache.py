@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import tempfile
+import unittest
+
+from oshinko_temaki import cache
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+def make_config(**kwargs):
+    return configs.ClusterConfig(argparse.Namespace(**kwargs))
+
+
+class TestRenderCache(unittest.TestCase):
+    def test_hit_substitutes_name(self):
+        """test that a hit returns the cached shape with the new name"""
+        render_cache = cache.RenderCache()
+        first = render_cache.render(
+            templates.CRDTemplate, make_config(name="one", workers=3))
+        second = render_cache.render(
+            templates.CRDTemplate, make_config(name="two", workers=3))
+        self.assertEqual(render_cache.stats()["hits"], 1)
+        self.assertEqual(render_cache.stats()["misses"], 1)
+        expected = json.loads(templates.CRDTemplate(
+            make_config(name="two", workers=3)).dumps())
+        self.assertEqual(json.loads(second.dumps()), expected)
+        self.assertEqual(json.loads(first.dumps())["metadata"]["name"], "one")
+
+    def test_key_includes_template(self):
+        """test that the same config renders separately per template"""
+        render_cache = cache.RenderCache()
+        render_cache.render(templates.CRDTemplate, make_config(name="a"))
+        cluster = render_cache.render(templates.CMTemplate,
+                                      make_config(name="a"))
+        self.assertEqual(render_cache.misses, 2)
+        self.assertEqual(json.loads(cluster.dumps())["kind"], "ConfigMap")
+
+    def test_key_normalizes_pairs(self):
+        """test that the key differs when parsed values differ"""
+        first = cache.config_key(templates.CRDTemplate,
+                                 configs.ClusterSpec.create(envs=["A=b=c"]))
+        second = cache.config_key(
+            templates.CRDTemplate,
+            configs.ClusterSpec.create(envs=["A=b", "c=d"]))
+        self.assertNotEqual(first, second)
+
+    def test_lru_eviction(self):
+        """test that the least recently used entry is evicted"""
+        render_cache = cache.RenderCache(maxsize=2)
+        for workers in (1, 2, 1, 3):
+            render_cache.render(templates.CRDTemplate,
+                                make_config(workers=workers))
+        render_cache.render(templates.CRDTemplate, make_config(workers=1))
+        self.assertEqual(render_cache.stats()["evictions"], 1)
+        self.assertEqual(render_cache.hits, 2)
+
+    def test_fifo_eviction(self):
+        """test that the oldest entry is evicted with fifo"""
+        render_cache = cache.RenderCache(maxsize=2, policy="fifo")
+        for workers in (1, 2, 1, 3):
+            render_cache.render(templates.CRDTemplate,
+                                make_config(workers=workers))
+        render_cache.render(templates.CRDTemplate, make_config(workers=1))
+        self.assertEqual(render_cache.hits, 1)
+
+    def test_persistence(self):
+        """test that entries survive a save and load"""
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        os.remove(path)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+
+        render_cache = cache.RenderCache(path=path)
+        render_cache.render(templates.CMTemplate, make_config(workers=2))
+        render_cache.save()
+
+        reloaded = cache.RenderCache(path=path)
+        cluster = reloaded.render(templates.CMTemplate,
+                                  make_config(name="x", workers=2))
+        self.assertEqual(reloaded.hits, 1)
+        self.assertEqual(json.loads(cluster.dumps())["metadata"]["name"], "x")
+
+    def test_corrupt_file(self):
+        """test that an unreadable cache file is ignored"""
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        for content in ('{"version": 3, "entr', "[]",
+                        '{"version": %d, "entries": [1]}'
+                        % cache.CACHE_VERSION):
+            with open(path, "w") as outfile:
+                outfile.write(content)
+            self.assertEqual(len(cache.RenderCache(path=path)), 0)
@@ -0,0 +1,64 @@
+import argparse
+import unittest
+
+from oshinko_temaki import compiled
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+CONFIGS = [
+    {"name": "test-cluster"},
+    {"name": "test-cluster", "masters": 2, "workers": 5,
+     "image": "some/custom:image"},
+    {"name": "test-cluster", "metrics": True, "webui": True,
+     "configmap": "testMap"},
+    {"name": "café", "envs": ["A=b=c", "QUOTE=\"x\""],
+     "sparkconfigs": ["spark.executor.memory=4g"],
+     "downloads": ["http://test.test/file::/tmp/"]},
+    {"name": "test-cluster", "envs": [], "sparkconfigs": [],
+     "downloads": []},
+    {"name": "test-cluster", "master_cpu_request": "500m",
+     "worker_cpu_limit": "2", "worker_memory_limit": "4Gi",
+     "image": "some/custom:image"},
+    {"name": "test-cluster", "labels": ["team=a", "radanalytics.io/kind=x"],
+     "annotations": ["note=ünïcode"]},
+    {"name": "test-cluster", "labels": [], "annotations": []},
+    {"name": "test-cluster", "scratch": "memory", "scratch_size": "1Gi",
+     "worker_memory_limit": "4Gi", "worker_volumes": True},
+    {"name": "test-cluster", "scratch": "pvc", "scratch_size": "20Gi",
+     "worker_volumes": True},
+]
+
+
+class TestCompiled(unittest.TestCase):
+    def check(self, output, template_class, encoding):
+        plan = compiled.get_plan(output, encoding)
+        for parms in CONFIGS:
+            conf = configs.ClusterConfig(argparse.Namespace(**parms))
+            expected = template_class(conf).dumps(encoding)
+            self.assertEqual(plan.render(conf), expected)
+
+    def test_crd(self):
+        """test that the compiled CRD matches the template byte for byte"""
+        self.check("cr", templates.CRDTemplate, "json")
+
+    def test_crd_compact(self):
+        """test the compiled CRD with the compact json encoding"""
+        self.check("cr", templates.CRDTemplate, "compact-json")
+
+    def test_cm(self):
+        """test that the compiled ConfigMap matches the template"""
+        self.check("cm", templates.CMTemplate, "json")
+
+    def test_cm_compact(self):
+        """test the compiled ConfigMap with the compact json encoding"""
+        self.check("cm", templates.CMTemplate, "compact-json")
+
+    def test_yaml_unsupported(self):
+        """test that the yaml encoding cannot be compiled"""
+        with self.assertRaises(ValueError):
+            compiled.get_plan("cr", "yaml")
+
+    def test_plan_reused(self):
+        """test that plans are compiled once"""
+        self.assertIs(compiled.get_plan("cr"), compiled.get_plan("cr"))
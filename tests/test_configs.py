@@ -0,0 +1,89 @@
+import argparse
+import os
+import tempfile
+import unittest
+
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+
+
+class TestClusterSpec(unittest.TestCase):
+    def test_defaults(self):
+        """test that a spec gets the same defaults as ClusterConfig"""
+        spec = configs.ClusterSpec.create()
+        self.assertTrue(spec.name.startswith("spark-"))
+        self.assertEqual((spec.masters, spec.workers), (1, 1))
+        self.assertIsNone(spec.envs)
+
+    def test_entries(self):
+        """test that pair strings are parsed into typed entries"""
+        spec = configs.ClusterSpec.create(
+            envs=["A=b=c"], sparkconfigs=["spark.x=1"],
+            downloads=["http://test.test/file::/tmp/"])
+        self.assertEqual(spec.envs, (configs.EnvVar("A", "b=c"),))
+        self.assertIsInstance(spec.sparkconfigs[0], configs.SparkConfig)
+        self.assertEqual(spec.downloads[0].to, "/tmp/")
+
+    def test_malformed_entries(self):
+        """test that malformed pairs name the expected form"""
+        with self.assertRaisesRegex(ValueError, "NAME=VALUE"):
+            configs.ClusterSpec.create(envs=["A"])
+        with self.assertRaisesRegex(ValueError, "URL::DIR"):
+            configs.ClusterSpec.create(downloads=["http://test.test"])
+
+    def test_immutable(self):
+        """test that a spec cannot be changed or grow attributes"""
+        spec = configs.ClusterSpec.create(name="test")
+        with self.assertRaises(AttributeError):
+            spec.name = "other"
+        with self.assertRaises(AttributeError):
+            spec.extra = 1
+
+    def test_from_args(self):
+        """test creating a spec from parsed arguments"""
+        parms = argparse.Namespace(name="test", workers=3, envs=["A=b"])
+        spec = configs.ClusterSpec.from_args(parms)
+        self.assertEqual(spec.workers, 3)
+        self.assertIs(configs.ClusterSpec.from_args(spec), spec)
+
+    def test_from_dict(self):
+        """test creating a spec from a mapping with string values"""
+        spec = configs.ClusterSpec.from_dict(
+            {"name": "test", "masters": "2", "webui": "true"})
+        self.assertEqual(spec.masters, 2)
+        self.assertIs(spec.webui, True)
+
+    def test_from_file(self):
+        """test creating a spec from a yaml file"""
+        fd, path = tempfile.mkstemp(suffix=".yaml")
+        with os.fdopen(fd, "w") as outfile:
+            outfile.write("name: test\nsparkconfigs: [a=1]\n")
+        self.addCleanup(os.remove, path)
+        spec = configs.ClusterSpec.from_file(path)
+        self.assertEqual(spec.sparkconfigs, (configs.SparkConfig("a", "1"),))
+
+    def test_template_shares_spec(self):
+        """test that templates read the spec without copying it"""
+        spec = configs.ClusterSpec.create(name="test", envs=["A=b"])
+        cluster = templates.CRDTemplate(spec)
+        self.assertIs(cluster.spec, spec)
+        self.assertEqual(cluster.envs, [{"name": "A", "value": "b"}])
+
+    def test_matches_config(self):
+        """test that a spec and a ClusterConfig render the same document"""
+        parms = argparse.Namespace(name="test", image="some/image",
+                                   sparkconfigs=["a=1"], metrics=True)
+        from_config = templates.CMTemplate(configs.ClusterConfig(parms))
+        from_spec = templates.CMTemplate(configs.ClusterSpec.from_args(parms))
+        self.assertEqual(from_config.dumps(), from_spec.dumps())
+
+
+class TestMergePairs(unittest.TestCase):
+    def test_last_wins(self):
+        """test that later groups override earlier keys in place"""
+        observed = configs.merge_pairs(["a=1", "b=2"], None, ["a=3", "c=4"])
+        self.assertEqual(observed, ["a=3", "b=2", "c=4"])
+
+    def test_all_none(self):
+        """test that nothing to merge stays None"""
+        self.assertIsNone(configs.merge_pairs(None, None))
@@ -0,0 +1,122 @@
+import io
+import json
+import unittest
+
+from oshinko_temaki import configs
+from oshinko_temaki import convert
+from oshinko_temaki import templates
+
+
+STREAM = """
+apiVersion: v1
+items:
+- {kind: ConfigMap, metadata: {name: a}}
+- {kind: ConfigMap, metadata: {name: b}}
+kind: List
+---
+---
+kind: SparkCluster
+metadata: {name: c}
+"""
+
+
+class TestLoadDocuments(unittest.TestCase):
+    def test_items(self):
+        """test that List items and documents are generated in order"""
+        names = [document["metadata"]["name"] for document
+                 in convert.load_documents(io.StringIO(STREAM))]
+        self.assertEqual(names, ["a", "b", "c"])
+
+    def test_lazy(self):
+        """test that items are generated before the stream is read"""
+        documents = convert.load_documents(io.StringIO(
+            "items:\n- {metadata: {name: a}}\n- [unclosed\n"))
+        self.assertEqual(next(documents)["metadata"]["name"], "a")
+
+
+class TestConvert(unittest.TestCase):
+    def spec(self):
+        return configs.ClusterSpec.create(
+            name="test", workers=3, image="some/image", metrics=True,
+            envs=["A=b"], sparkconfigs=["spark.x=1"],
+            downloads=["http://test.test/file::/tmp/"],
+            worker_memory_limit="4Gi", labels=["team=a"])
+
+    def test_round_trip(self):
+        """test that a cluster survives both conversions"""
+        spec = self.spec()
+        for template_class, source in ((templates.CMTemplate, "cm"),
+                                       (templates.CRDTemplate, "cr")):
+            document = json.loads(template_class(spec).dumps())
+            self.assertEqual(convert.read_document(document),
+                             (source, spec))
+
+    def test_scratch_round_trip(self):
+        """test that every kind of scratch volume survives conversion"""
+        for kind, size in (("memory", "1Gi"), ("disk", None),
+                           ("pvc", "20Gi")):
+            spec = configs.ClusterSpec.create(
+                name="test", scratch=kind, scratch_size=size,
+                worker_volumes=True)
+            document = json.loads(templates.CRDTemplate(spec).dumps())
+            self.assertEqual(convert.read_document(document), ("cr", spec))
+
+    def test_other_volumes(self):
+        """test that volumes osht did not render are not converted"""
+        spec = configs.ClusterSpec.create(name="test", scratch="disk",
+                                          worker_volumes=True)
+        document = json.loads(templates.CRDTemplate(spec).dumps())
+        document["spec"]["worker"]["volumeMounts"][0]["mountPath"] = "/x"
+        with self.assertRaises(ValueError):
+            convert.read_document(document)
+
+    def test_namespace(self):
+        """test that a converted cluster keeps its namespace"""
+        document = json.loads(templates.CMTemplate(self.spec()).dumps())
+        document["metadata"]["namespace"] = "team-a"
+        converted = json.loads(next(convert.Converter().convert([document])))
+        self.assertEqual(list(converted["metadata"])[:2],
+                         ["name", "namespace"])
+        self.assertEqual(converted["metadata"]["namespace"], "team-a")
+
+    def test_broken_clusters(self):
+        """test that clusters that cannot be read are skipped"""
+        labels = {convert.KIND_LABEL: "SparkCluster"}
+        documents = [
+            {"kind": "ConfigMap", "metadata": {"name": "a", "labels": labels},
+             "data": {"config": "master: [1\n"}},
+            {"kind": "SparkCluster", "metadata": "foo"},
+            {"kind": "SparkCluster", "metadata": [1]},
+            {"kind": "ConfigMap", "metadata": {"name": "b", "labels": labels},
+             "data": "foo"},
+            json.loads(templates.CMTemplate(self.spec()).dumps()),
+        ]
+        reported = []
+        converter = convert.Converter(
+            report=lambda description, exc: reported.append(description))
+        self.assertEqual(len(list(converter.convert(documents))), 1)
+        self.assertEqual(converter.summary(),
+                         {"converted": 1, "skipped": 4})
+        self.assertEqual(reported, ["ConfigMap/a", "SparkCluster/None",
+                                    "SparkCluster/None", "ConfigMap/b"])
+
+    def test_converter(self):
+        """test converting a stream and the summary of skipped documents"""
+        documents = [
+            json.loads(templates.CMTemplate(self.spec()).dumps()),
+            {"kind": "ConfigMap", "metadata": {"name": "other"}},
+            {"kind": "SparkCluster", "metadata": {"name": "bad"},
+             "spec": {"master": {"instances": 1}, "nodeTracker": True}},
+        ]
+        reported = []
+        converter = convert.Converter(
+            report=lambda description, exc: reported.append(
+                (description, type(exc))))
+        converted = list(converter.convert(documents))
+        self.assertEqual(converted,
+                         [templates.CRDTemplate(self.spec()).dumps()])
+        self.assertEqual(converter.summary(),
+                         {"converted": 1, "skipped": 2})
+        self.assertEqual(reported,
+                         [("ConfigMap/other", convert.NotACluster),
+                          ("SparkCluster/bad", ValueError)])
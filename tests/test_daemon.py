@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from oshinko_temaki import client
+from oshinko_temaki import configs
+from oshinko_temaki import daemon
+from oshinko_temaki import templates
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "osht.sock")
+        self.server = daemon.RenderServer(self.path)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       args=(0.01,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir)
+
+    def request(self, kind, argv=(), env=None):
+        reply = client.send(self.path, client.encode_request(
+            kind, list(argv), self.tmpdir, env))
+        return client.decode_reply(reply)
+
+    def test_render(self):
+        """test that the daemon renders like the cli"""
+        status, code, stdout, _ = self.request("render", ["-n", "test"])
+        spec = configs.ClusterSpec.create(name="test")
+        self.assertEqual((status, code), ("ok", 0))
+        self.assertEqual(stdout, templates.CRDTemplate(spec).dumps() + "\n")
+
+    def test_errors(self):
+        """test that argument errors are returned with their exit code"""
+        status, code, stdout, stderr = self.request("render", ["-w", "x"])
+        self.assertEqual((status, code, stdout), ("ok", 2, ""))
+        self.assertIn("invalid int value", stderr)
+
+    def test_relative_paths(self):
+        """test that paths are relative to the directory of the client"""
+        with open(os.path.join(self.tmpdir, "m.yaml"), "w") as outfile:
+            outfile.write("- name: a\n- name: b\n")
+        status, code, stdout, _ = self.request(
+            "render", ["-f", "m.yaml", "--output-file", "out.yaml"])
+        self.assertEqual((status, code, stdout), ("ok", 0, ""))
+        with open(os.path.join(self.tmpdir, "out.yaml")) as infile:
+            self.assertEqual(infile.read().count("---"), 2)
+
+    def test_declined(self):
+        """test that requests needing the client process are declined"""
+        for argv in (["-f", "-"], ["--timings"], ["-p", "4", "-f", "m"]):
+            self.assertEqual(self.request("render", argv)[0], "declined")
+        self.assertIsNone(client.forward(["--timings"], self.path))
+
+    def test_concurrent(self):
+        """test that concurrent requests get their own output"""
+        results = {}
+
+        def render(name):
+            results[name] = self.request("render", ["-n", name])[2]
+
+        threads = [threading.Thread(target=render, args=("c{}".format(i),))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name, stdout in results.items():
+            self.assertEqual(json.loads(stdout)["metadata"]["name"], name)
+
+    def test_stats(self):
+        """test that the latency of the requests is reported"""
+        self.request("render", ["-n", "test"])
+        self.request("render", ["--timings"])
+        stats = json.loads(self.request("stats")[2])
+        self.assertEqual(stats["latency_us"]["count"], 1)
+        self.assertEqual(stats["declined"], 1)
+
+
+class TestClient(unittest.TestCase):
+    def test_no_daemon(self):
+        """test that the client falls back without a daemon"""
+        path = os.path.join(tempfile.gettempdir(), "osht-missing.sock")
+        self.assertIsNone(client.forward(["-n", "test"], path))
+
+    def test_socket_path(self):
+        """test the default socket locations"""
+        environ = dict(os.environ)
+        try:
+            os.environ.pop("OSHT_SOCKET", None)
+            os.environ["XDG_RUNTIME_DIR"] = "/run/user/1"
+            self.assertEqual(client.socket_path(), "/run/user/1/osht.sock")
+            os.environ["OSHT_SOCKET"] = "/tmp/x.sock"
+            self.assertEqual(client.socket_path(), "/tmp/x.sock")
+            del os.environ["OSHT_SOCKET"], os.environ["XDG_RUNTIME_DIR"]
+            self.assertIsNone(client.socket_path())
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
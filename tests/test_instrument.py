@@ -0,0 +1,47 @@
+import unittest
+
+from oshinko_temaki import compiled
+from oshinko_temaki import configs
+from oshinko_temaki import instrument
+from oshinko_temaki import templates
+
+
+class TestInstrument(unittest.TestCase):
+    def test_no_hooks(self):
+        """test that stages cost nothing without a hook"""
+        self.assertIs(instrument.stage("a"), instrument.stage("b"))
+
+    def test_template_stages(self):
+        """test that rendering a template reports its stages"""
+        with instrument.Timings() as timings:
+            for _ in range(3):
+                templates.CRDTemplate(configs.ClusterSpec.create()).dumps()
+        summary = timings.summary()
+        self.assertEqual(list(summary["stages_us"]),
+                         ["config", "render", "serialize"])
+        self.assertEqual(summary["stages_us"]["render"]["count"], 3)
+        self.assertEqual(summary["document_bytes"]["count"], 3)
+        self.assertGreater(summary["document_bytes"]["min"], 100)
+
+    def test_compiled_stage(self):
+        """test that compiled plans report their stage"""
+        with instrument.Timings() as timings:
+            compiled.get_plan("cr").render(configs.ClusterSpec.create())
+        self.assertIn("compiled", timings.stages)
+        self.assertEqual(timings.sizes.count, 1)
+
+    def test_hook_removed(self):
+        """test that a finished Timings no longer receives measurements"""
+        with instrument.Timings() as timings:
+            pass
+        templates.CRDTemplate(configs.ClusterSpec.create()).dumps()
+        self.assertEqual(timings.stages, {})
+
+    def test_histogram(self):
+        """test the power of two buckets"""
+        histogram = instrument.Histogram()
+        for value in (0.5, 3, 3, 100):
+            histogram.add(value)
+        summary = histogram.summary()
+        self.assertEqual(summary["buckets"], {"1": 1, "4": 2, "128": 1})
+        self.assertEqual(summary["max"], 100)
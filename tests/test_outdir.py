@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from oshinko_temaki import outdir
+
+
+class TestOutputDirectory(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def write_all(self, documents, encoding="json"):
+        with outdir.OutputDirectory(self.path, encoding) as directory:
+            for name, document in documents.items():
+                directory.write(name, document)
+        return directory.report()
+
+    def test_first_run(self):
+        """test that every cluster is added on the first run"""
+        report = self.write_all({"a": '{"a": 1}', "b": '{"b": 1}'})
+        self.assertEqual(sorted(report["added"]), ["a", "b"])
+        with open(os.path.join(self.path, "a.json")) as infile:
+            self.assertEqual(infile.read(), '{"a": 1}\n')
+
+    def test_unchanged_not_written(self):
+        """test that unchanged documents keep their files untouched"""
+        self.write_all({"a": '{"a": 1}', "b": '{"b": 1}'})
+        path = os.path.join(self.path, "a.json")
+        os.utime(path, (0, 0))
+        report = self.write_all({"a": '{"a": 1}', "b": '{"b": 2}'})
+        self.assertEqual(report, {"added": [], "changed": ["b"],
+                                  "removed": [], "unchanged": 1})
+        self.assertEqual(os.stat(path).st_mtime, 0)
+
+    def test_removed(self):
+        """test that clusters missing from a run are removed"""
+        self.write_all({"a": '{"a": 1}', "b": '{"b": 1}'})
+        report = self.write_all({"a": '{"a": 1}'})
+        self.assertEqual(report["removed"], ["b"])
+        self.assertFalse(os.path.exists(os.path.join(self.path, "b.json")))
+
+    def test_encoding_change(self):
+        """test that switching encoding replaces the old files"""
+        self.write_all({"a": '{"a": 1}'})
+        report = self.write_all({"a": "a: 1\n"}, "yaml")
+        self.assertEqual(report["changed"], ["a"])
+        self.assertEqual(os.listdir(self.path).count("a.json"), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.path, "a.yaml")))
+
+    def test_duplicate_name(self):
+        """test that a name can only be written once per run"""
+        directory = outdir.OutputDirectory(self.path)
+        directory.write("a", "{}")
+        with self.assertRaises(ValueError):
+            directory.write("a", "{}")
+
+    def test_invalid_name(self):
+        """test that names cannot point outside the directory"""
+        directory = outdir.OutputDirectory(self.path)
+        for name in ("../evil", "a/b", "", "/tmp/x"):
+            with self.assertRaises(ValueError):
+                directory.write(name, "{}")
+        self.assertEqual(os.listdir(self.path), [])
+
+    def test_index_outside(self):
+        """test that an edited index cannot remove files elsewhere"""
+        self.write_all({"a": '{"a": 1}'})
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        victim = os.path.join(outside, "victim.json")
+        open(victim, "w").close()
+        with open(os.path.join(self.path, outdir.INDEX_FILE), "w") as index:
+            json.dump({"b": {"file": os.path.relpath(victim, self.path),
+                             "sha256": ""}}, index)
+        with self.assertRaises(ValueError):
+            self.write_all({"a": '{"a": 1}'})
+        self.assertTrue(os.path.exists(victim))
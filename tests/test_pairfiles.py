@@ -0,0 +1,57 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from oshinko_temaki import cli
+from oshinko_temaki import pairfiles
+
+
+class TestSparkDefaults(unittest.TestCase):
+    def test_separators(self):
+        """test the whitespace, = and : separators of properties"""
+        lines = io.StringIO("# comment\n! also\n\nspark.a 1\n"
+                            "spark.b=2\nspark.c: x:y\nspark.d\t =  4\n"
+                            "spark.e\n")
+        self.assertEqual(list(pairfiles.read_spark_defaults(lines)),
+                         ["spark.a=1", "spark.b=2", "spark.c=x:y",
+                          "spark.d=4", "spark.e="])
+
+
+class TestDotenv(unittest.TestCase):
+    def test_values(self):
+        """test exports, quotes and comments"""
+        lines = io.StringIO("# comment\nexport A=1\nB='a # b'\n"
+                            'C="say \\"hi\\"\\n"\nD=plain # note\nE=\n')
+        self.assertEqual(list(pairfiles.read_dotenv(lines)),
+                         ["A=1", "B=a # b", 'C=say "hi"\n', "D=plain",
+                          "E="])
+
+    def test_invalid(self):
+        """test that bad lines name the file and line"""
+        for text in ("A=1\nnot a pair\n", "A='open\n", "1A=x\n"):
+            with self.assertRaisesRegex(ValueError, "^test.env:"):
+                list(pairfiles.read_dotenv(io.StringIO(text), "test.env"))
+
+
+class TestCLI(unittest.TestCase):
+    def test_precedence(self):
+        """test that later files and then the flags win for a key"""
+        tmpdir = tempfile.mkdtemp()
+        first = os.path.join(tmpdir, "first.conf")
+        second = os.path.join(tmpdir, "second.conf")
+        with open(first, "w") as outfile:
+            outfile.write("spark.a 1\nspark.b 1\nspark.c 1\n")
+        with open(second, "w") as outfile:
+            outfile.write("spark.b 2\nspark.a 2\n")
+
+        output = os.path.join(tmpdir, "out.json")
+        cli.main(["-n", "test", "--sparkconfig-file", first,
+                  "--sparkconfig-file", second, "-s", "spark.c=3",
+                  "--output-file", output])
+        with open(output) as infile:
+            observed = json.load(infile)["spec"]["sparkConfiguration"]
+        self.assertEqual(observed, [{"name": "spark.a", "value": "2"},
+                                    {"name": "spark.b", "value": "2"},
+                                    {"name": "spark.c", "value": "3"}])
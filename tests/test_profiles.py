@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from oshinko_temaki import configs
+from oshinko_temaki import profiles
+
+
+class TestProfiles(unittest.TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+
+    def write_profile(self, name, content):
+        path = os.path.join(self.profile_dir, name)
+        with open(path, "w") as outfile:
+            outfile.write(content)
+        return path
+
+    def test_builtin(self):
+        """test expanding a built in profile"""
+        expanded = profiles.expand("throughput")
+        self.assertIn("spark.serializer="
+                      "org.apache.spark.serializer.KryoSerializer", expanded)
+        for name, profile in profiles.PROFILES.items():
+            self.assertIsInstance(profile["version"], int)
+
+    def test_unknown(self):
+        """test that an unknown profile is rejected"""
+        with self.assertRaises(ValueError):
+            profiles.expand("fastest", self.profile_dir)
+
+    def test_directory(self):
+        """test loading a profile from the profile directory"""
+        self.write_profile("team.yaml", (
+            "version: 2\n"
+            "sparkconfigs:\n"
+            "  spark.speculation: true\n"
+            "  spark.executor.cores: 4\n"))
+        expanded = profiles.expand("team", self.profile_dir)
+        self.assertEqual(expanded, ["spark.speculation=true",
+                                    "spark.executor.cores=4"])
+
+    def test_extends(self):
+        """test that a profile file overrides the profile it extends"""
+        path = self.write_profile("custom.yml", (
+            "extends: latency\n"
+            "sparkconfigs:\n"
+            "  spark.locality.wait: 1s\n"))
+        expanded = dict(item.split("=", 1)
+                        for item in profiles.expand(path))
+        self.assertEqual(expanded["spark.locality.wait"], "1s")
+        self.assertEqual(expanded["spark.scheduler.mode"], "FAIR")
+
+    def test_extends_loop(self):
+        """test that a profile cannot extend itself"""
+        self.write_profile("loop.yaml",
+                           "extends: loop\nsparkconfigs: {}\n")
+        with self.assertRaises(ValueError):
+            profiles.expand("loop", self.profile_dir)
+
+    def test_explicit_overrides(self):
+        """test that explicit spark configs win over the profile"""
+        merged = configs.merge_pairs(profiles.expand("latency"),
+                                     ["spark.speculation=false"])
+        self.assertIn("spark.speculation=false", merged)
+        self.assertNotIn("spark.speculation=true", merged)
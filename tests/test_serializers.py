@@ -0,0 +1,49 @@
+import json
+import unittest
+
+import yaml
+
+from oshinko_temaki import configs
+from oshinko_temaki import serializers
+from oshinko_temaki import templates
+
+
+class TestSerializers(unittest.TestCase):
+    data = {
+        "master": {"instances": 1},
+        "worker": {"instances": 3},
+        "customImage": "quay.io/some/image:1.0",
+        "metrics": True,
+        "env": [{"name": "KEY", "value": "a=b"}],
+        "downloadData": [{"url": "http://test.test/f?x=1", "to": "/tmp/"}],
+    }
+
+    def test_yaml_matches_pure_python(self):
+        """test that the yaml backend matches the pure python dumper"""
+        observed = serializers.get_serializer("yaml").dumps(self.data)
+        self.assertEqual(observed, yaml.dump(self.data))
+
+    def test_yaml_fallback(self):
+        """test that the pure python dumper is used without libyaml"""
+        serializer = serializers.YAMLSerializer()
+        serializer._dumper = yaml.SafeDumper
+        self.assertEqual(serializer.dumps(self.data), yaml.dump(self.data))
+
+    def test_compact_json(self):
+        """test that compact json has no optional whitespace"""
+        observed = serializers.get_serializer("compact-json").dumps(self.data)
+        self.assertNotIn(" ", observed.replace("quay.io", ""))
+        self.assertEqual(json.loads(observed), self.data)
+
+    def test_unknown(self):
+        """test that an unknown encoding is rejected"""
+        with self.assertRaises(ValueError):
+            serializers.get_serializer("toml")
+
+    def test_template_encodings(self):
+        """test that every encoding round trips a template"""
+        parms = configs.ClusterConfig(object())
+        cluster = templates.CRDTemplate(parms)
+        for name in serializers.SERIALIZERS:
+            raw = cluster.dumps(name)
+            self.assertEqual(serializers.load_yaml(raw), cluster._data)
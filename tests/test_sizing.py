@@ -0,0 +1,101 @@
+import unittest
+
+from oshinko_temaki import sizing
+
+
+class TestSizing(unittest.TestCase):
+    def test_parse_memory(self):
+        """test parsing the memory size formats"""
+        self.assertEqual(sizing.parse_memory("512m"), 512 * sizing.MIB)
+        self.assertEqual(sizing.parse_memory("4Gi"), 4096 * sizing.MIB)
+        self.assertEqual(sizing.parse_memory("1.5GB"), 1536 * sizing.MIB)
+        self.assertEqual(sizing.parse_memory(1024), 1024)
+        with self.assertRaises(ValueError):
+            sizing.parse_memory("lots")
+
+    def test_spark_memory(self):
+        """test formatting sizes for spark configs"""
+        self.assertEqual(sizing.spark_memory(4096 * sizing.MIB), "4g")
+        self.assertEqual(sizing.spark_memory(1500 * sizing.MIB), "1500m")
+
+    def test_executor_memory_fits(self):
+        """test that heap and overhead fit in the usable node memory"""
+        result = sizing.size_cluster(16, "64g")
+        configs = dict(item.split("=", 1) for item in result.sparkconfigs)
+        self.assertEqual(configs["spark.executor.cores"], "5")
+        heap = sizing.parse_memory(configs["spark.executor.memory"])
+        overhead = sizing.parse_memory(
+            configs["spark.executor.memoryOverhead"])
+        self.assertGreaterEqual(overhead, sizing.MIN_OVERHEAD)
+        self.assertLessEqual(3 * (heap + overhead),
+                             sizing.parse_memory("63g"))
+
+    def test_workers_from_input(self):
+        """test that the input size drives the worker count"""
+        small = sizing.size_cluster(8, "32g", input_size="1g")
+        large = sizing.size_cluster(8, "32g", input_size="1t")
+        self.assertEqual(small.workers, 1)
+        # 8192 partitions / 3 tasks per core / 5 cores per worker
+        self.assertEqual(large.workers, 547)
+
+    def test_workers_from_parallelism(self):
+        """test that a target parallelism sets the cores"""
+        result = sizing.size_cluster(4, "16g", parallelism=12)
+        # 3 usable cores per node, one executor of 3 cores each
+        self.assertEqual(result.workers, 4)
+        self.assertIn("spark.sql.shuffle.partitions=36", result.sparkconfigs)
+
+    def test_too_little_memory(self):
+        """test that nodes without room for an executor are rejected"""
+        with self.assertRaises(ValueError):
+            sizing.size_cluster(4, "1g")
+
+    def test_parse_quantity(self):
+        """test parsing kubernetes quantities"""
+        self.assertEqual(sizing.parse_quantity("500m"), 0.5)
+        self.assertEqual(sizing.parse_quantity("2"), 2)
+        self.assertEqual(sizing.parse_quantity("4G"), 4 * 10 ** 9)
+        self.assertEqual(sizing.parse_quantity("4000M"), 4 * 10 ** 9)
+        self.assertEqual(sizing.parse_quantity("512Mi"), 512 * sizing.MIB)
+        self.assertEqual(sizing.parse_quantity("1e3"), 1000)
+        self.assertEqual(sizing.parse_quantity("1E"), 10 ** 18)
+        for text in ("64g", "4gi", "1.5GB", "lots", ""):
+            with self.assertRaises(ValueError):
+                sizing.parse_quantity(text)
+
+    def test_too_few_cpus(self):
+        """test that nodes without a cpu left for executors are rejected"""
+        for cpus in (1, 0, -2):
+            with self.assertRaises(ValueError):
+                sizing.size_cluster(cpus, "16g")
+
+    def test_explicit_executor_cores(self):
+        """test that the memory is sized for the given executor cores"""
+        result = sizing.size_cluster(8, "32g", executor_cores=2)
+        configs = dict(item.split("=", 1) for item in result.sparkconfigs)
+        self.assertEqual(configs["spark.executor.cores"], "2")
+        heap = sizing.parse_memory(configs["spark.executor.memory"])
+        overhead = sizing.parse_memory(
+            configs["spark.executor.memoryOverhead"])
+        self.assertLessEqual(3 * (heap + overhead),
+                             sizing.parse_memory("31g"))
+        with self.assertRaises(ValueError):
+            sizing.size_cluster(8, "32g", executor_cores=8)
+
+    def test_explicit_executor_memory(self):
+        """test that executors are only counted if their memory fits"""
+        result = sizing.size_cluster(8, "32g", executor_cores=2,
+                                     executor_memory="20g")
+        self.assertIn("spark.executor.memory=20g", result.sparkconfigs)
+        self.assertIn("spark.executor.memoryOverhead=2g",
+                      result.sparkconfigs)
+        self.assertIn("spark.default.parallelism=6", result.sparkconfigs)
+        with self.assertRaises(ValueError):
+            sizing.size_cluster(8, "32g", executor_memory="40g")
+
+    def test_explicit_executor_overhead(self):
+        """test that a given overhead is kept and the heap sized around it"""
+        result = sizing.size_cluster(2, "5g", executor_overhead="1g")
+        self.assertEqual(result.sparkconfigs[1:3],
+                         ["spark.executor.memory=3g",
+                          "spark.executor.memoryOverhead=1g"])
@@ -0,0 +1,74 @@
+import itertools
+import unittest
+
+from oshinko_temaki import sweep
+
+
+class TestAxis(unittest.TestCase):
+    def test_list(self):
+        """test parsing a list of values"""
+        axis = sweep.Axis.parse("image=a/b:1,c/d:2")
+        self.assertEqual(axis, ("image", ("a/b:1", "c/d:2")))
+
+    def test_range(self):
+        """test that ranges include the stop value and take a step"""
+        self.assertEqual(sweep.Axis.parse("workers=2..8:2").values,
+                         (2, 4, 6, 8))
+        self.assertEqual(sweep.Axis.parse("spark.x=1..2").values,
+                         ("1", "2"))
+
+    def test_invalid(self):
+        """test that unknown parameters and bad values are rejected"""
+        for text in ("worker=1", "workers", "workers=a,b", "masters=3..1"):
+            with self.assertRaises(ValueError):
+                sweep.Axis.parse(text)
+        with self.assertRaises(ValueError):
+            sweep.parse_axes(["workers=1", "workers=2"])
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.axes = sweep.parse_axes(["workers=1..3", "image=a/b:1,c",
+                                      "spark.executor.memory=2g,4g"])
+
+    def test_points(self):
+        """test that the points follow the cartesian product"""
+        expected = list(itertools.product(
+            *[axis.values for axis in self.axes]))
+        self.assertEqual([values for _, values in sweep.points(self.axes)],
+                         expected)
+
+    def test_sample(self):
+        """test that a sample is a stable ordered subset"""
+        first = list(sweep.points(self.axes, sample=4, seed=1))
+        self.assertEqual(first, list(sweep.points(self.axes, 4, 1)))
+        indexes = [index for index, _ in first]
+        self.assertEqual(indexes, sorted(set(indexes)))
+        self.assertEqual(len(indexes), 4)
+        for index, values in first:
+            self.assertEqual(values, sweep.point(self.axes, index))
+
+    def test_definitions(self):
+        """test the names, fields and coordinates of the definitions"""
+        base = {"workers": 9, "sparkconfigs": ["spark.executor.memory=1g",
+                                               "spark.x=1"]}
+        definitions = list(sweep.definitions(self.axes, base, "exp"))
+        self.assertEqual(len(definitions), 12)
+        definition = definitions[1]
+        self.assertEqual(definition["name"], "exp-1")
+        self.assertEqual(definition["workers"], 1)
+        self.assertEqual(definition["image"], "a/b:1")
+        self.assertEqual(definition["sparkconfigs"],
+                         ["spark.executor.memory=4g", "spark.x=1"])
+        self.assertIn("sweep.osht.io/point=1", definition["labels"])
+        self.assertIn("sweep.osht.io/workers=1", definition["labels"])
+        # the image is not a valid label value, it is only annotated
+        self.assertNotIn("sweep.osht.io/image=a/b:1", definition["labels"])
+        self.assertIn("sweep.osht.io/image=a/b:1", definition["annotations"])
+
+    def test_stable_names(self):
+        """test that an unnamed sweep gets the same names every time"""
+        first = [d["name"] for d in sweep.definitions(self.axes)]
+        second = [d["name"] for d in sweep.definitions(self.axes)]
+        self.assertEqual(first, second)
+        self.assertEqual(len(set(first)), len(first))
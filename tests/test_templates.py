@@ -1,4 +1,5 @@
 import argparse
+import functools
 import json
 import unittest
 
@@ -302,3 +303,173 @@ class TestCRDTemplate(unittest.TestCase):
         raw = templates.CRDTemplate(conf).dumps()
         observed = json.loads(raw)
         self.assertDictEqual(observed, expected)
+
+
+class TestResources(unittest.TestCase):
+    def test_crd_resources(self):
+        """test adding master and worker resources to the CRD"""
+        parms = argparse.Namespace(name="test-cluster",
+                                   master_cpu_request="500m",
+                                   worker_cpu_limit="2",
+                                   worker_memory_request="2Gi",
+                                   worker_memory_limit="4Gi")
+        conf = configs.ClusterConfig(parms)
+        observed = json.loads(templates.CRDTemplate(conf).dumps())
+        self.assertDictEqual(observed["spec"]["master"],
+                             {"instances": 1, "cpuRequest": "500m"})
+        self.assertDictEqual(observed["spec"]["worker"],
+                             {"instances": 1, "cpuLimit": "2",
+                              "memoryRequest": "2Gi", "memoryLimit": "4Gi"})
+
+    def test_cm_resources(self):
+        """test adding worker resources to the ConfigMap"""
+        parms = argparse.Namespace(name="test-cluster",
+                                   worker_memory_limit="4Gi")
+        conf = configs.ClusterConfig(parms)
+        raw = json.loads(templates.CMTemplate(conf).dumps())
+        observed = yaml.load(raw["data"]["config"], Loader=yaml.FullLoader)
+        self.assertDictEqual(observed["worker"],
+                             {"instances": 1, "memoryLimit": "4Gi"})
+
+    def test_executor_fits(self):
+        """test that executor memory within the worker limit is accepted"""
+        spec = configs.ClusterSpec.create(
+            worker_memory_limit="4Gi",
+            sparkconfigs=["spark.executor.memory=3g"])
+        self.assertEqual(spec.worker_memory_limit, "4Gi")
+
+    def test_executor_too_large(self):
+        """test that executor memory plus overhead must fit the worker"""
+        with self.assertRaises(ValueError):
+            configs.ClusterSpec.create(
+                worker_memory_limit="4Gi",
+                sparkconfigs=["spark.executor.memory=3800m"])
+
+    def test_executors_per_worker(self):
+        """test that every executor a worker holds is counted"""
+        with self.assertRaises(ValueError):
+            configs.ClusterSpec.create(
+                worker_cpu_limit="4", worker_memory_limit="8Gi",
+                sparkconfigs=["spark.executor.memory=3g",
+                              "spark.executor.cores=1"])
+
+    def test_decimal_worker_memory(self):
+        """test that G in a worker memory is a decimal unit"""
+        for memory in ("4G", "4000M"):
+            with self.assertRaises(ValueError):
+                configs.ClusterSpec.create(
+                    worker_memory_limit=memory,
+                    sparkconfigs=["spark.executor.memory=3500m"])
+
+    def test_invalid_quantity(self):
+        """test that resources must be kubernetes quantities"""
+        for field in configs.RESOURCE_FIELDS:
+            with self.assertRaisesRegex(ValueError, field):
+                configs.ClusterSpec.create(**{field: "64g"})
+
+    def test_zero_executor_cores(self):
+        """test that executors without cores are rejected"""
+        with self.assertRaises(ValueError):
+            configs.ClusterSpec.create(
+                worker_cpu_limit="4", worker_memory_limit="8Gi",
+                sparkconfigs=["spark.executor.memory=3g",
+                              "spark.executor.cores=0"])
+
+
+class TestMetadata(unittest.TestCase):
+    def test_labels(self):
+        """test that labels and annotations are added to the metadata"""
+        spec = configs.ClusterSpec.create(
+            name="test", labels=["team=a", "team=b"],
+            annotations=["note=x"])
+        metadata = templates.CRDTemplate(spec).render()["metadata"]
+        self.assertEqual(metadata, {"name": "test", "labels": {"team": "b"},
+                                    "annotations": {"note": "x"}})
+
+    def test_configmap_labels(self):
+        """test that the ConfigMap keeps its kind label first"""
+        spec = configs.ClusterSpec.from_dict(
+            {"name": "test", "labels": {"team": "a"}})
+        labels = templates.CMTemplate(spec).render()["metadata"]["labels"]
+        self.assertEqual(list(labels.items()),
+                         [("radanalytics.io/kind", "SparkCluster"),
+                          ("team", "a")])
+
+
+class TestScratch(unittest.TestCase):
+    def test_memory_scratch(self):
+        """test a tmpfs scratch volume and the local dir entries"""
+        spec = configs.ClusterSpec.create(
+            name="test", scratch="memory", scratch_size="2Gi",
+            envs=["A=b"], worker_volumes=True)
+        spec_data = templates.CRDTemplate(spec).render()["spec"]
+        self.assertEqual(spec_data["worker"]["volumes"],
+                         [{"name": "spark-scratch",
+                           "emptyDir": {"medium": "Memory",
+                                        "sizeLimit": "2Gi"}}])
+        self.assertEqual(spec_data["worker"]["volumeMounts"],
+                         [{"name": "spark-scratch",
+                           "mountPath": configs.SCRATCH_DIR}])
+        self.assertNotIn("volumes", spec_data["master"])
+        self.assertEqual(spec_data["env"],
+                         [{"name": "A", "value": "b"},
+                          {"name": "SPARK_LOCAL_DIRS",
+                           "value": configs.SCRATCH_DIR}])
+        self.assertEqual(spec_data["sparkConfiguration"],
+                         [{"name": "spark.local.dir",
+                           "value": configs.SCRATCH_DIR}])
+
+    def test_pvc_scratch(self):
+        """test that a claim scratch volume is created with every worker"""
+        spec = configs.ClusterSpec.create(scratch="pvc", scratch_size="50Gi",
+                                          worker_volumes=True)
+        raw = json.loads(templates.CMTemplate(spec).dumps())
+        observed = yaml.load(raw["data"]["config"], Loader=yaml.FullLoader)
+        claim = observed["worker"]["volumes"][0]["ephemeral"]
+        self.assertEqual(
+            claim["volumeClaimTemplate"]["spec"]["resources"],
+            {"requests": {"storage": "50Gi"}})
+
+    def test_explicit_local_dir(self):
+        """test that an explicit spark.local.dir is kept"""
+        spec = configs.ClusterSpec.create(
+            scratch="disk", sparkconfigs=["spark.local.dir=/data"],
+            worker_volumes=True)
+        self.assertEqual(spec.sparkconfigs,
+                         (configs.SparkConfig("spark.local.dir", "/data"),))
+        self.assertEqual(spec.volumes("worker")["volumes"],
+                         [{"name": "spark-scratch", "emptyDir": {}}])
+
+    def test_invalid_scratch(self):
+        """test the scratch kind and size checks"""
+        for fields in ({"scratch": "nvme"}, {"scratch": "memory"},
+                       {"scratch_size": "1Gi"},
+                       {"scratch": "pvc", "scratch_size": "lots"},
+                       {"scratch": "memory", "scratch_size": "2g"}):
+            with self.assertRaises(ValueError):
+                configs.ClusterSpec.create(worker_volumes=True, **fields)
+
+    def test_unsupported_operator(self):
+        """test that scratch fails unless the operator mounts volumes"""
+        with self.assertRaisesRegex(ValueError, "worker_volumes"):
+            configs.ClusterSpec.create(scratch="disk")
+
+    def test_tmpfs_budget(self):
+        """test that tmpfs scratch and executors share the worker memory"""
+        create = functools.partial(configs.ClusterSpec.create,
+                                   worker_volumes=True)
+        create(
+            worker_memory_limit="4Gi", scratch="memory", scratch_size="1Gi",
+            sparkconfigs=["spark.executor.memory=2g"])
+        # scratch on disk takes no memory
+        create(
+            worker_memory_limit="4Gi", scratch="disk", scratch_size="8Gi",
+            sparkconfigs=["spark.executor.memory=3g"])
+        with self.assertRaisesRegex(ValueError, "scratch volume 2g"):
+            create(
+                worker_memory_limit="4Gi", scratch="memory",
+                scratch_size="2Gi", sparkconfigs=["spark.executor.memory=2g"])
+        with self.assertRaises(ValueError):
+            create(
+                worker_memory_limit="4Gi", scratch="memory",
+                scratch_size="5Gi")
@@ -0,0 +1,74 @@
+import unittest
+
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+from oshinko_temaki import validation
+
+
+class TestValidation(unittest.TestCase):
+    def test_valid_templates(self):
+        """test that rendered documents match their schema"""
+        spec = configs.ClusterSpec.create(
+            name="test", workers=3, image="some/image", metrics=True,
+            envs=["A=b"], sparkconfigs=["spark.x=1"],
+            downloads=["http://test.test/file::/tmp/"],
+            worker_memory_limit="4Gi", scratch="memory", scratch_size="1Gi",
+            worker_volumes=True)
+        for template_class in (templates.CRDTemplate, templates.CMTemplate):
+            self.assertEqual(
+                validation.validate_template(template_class(spec)), [])
+
+    def test_collects_errors(self):
+        """test that every error of a document is reported"""
+        spec = configs.ClusterSpec.create(name="Bad_Name", workers=-1)
+        errors = validation.validate_template(templates.CRDTemplate(spec))
+        self.assertEqual([path for path, _ in errors],
+                         [".metadata.name", ".spec.worker.instances"])
+
+    def test_configmap_config(self):
+        """test that the config embedded in a ConfigMap is checked"""
+        spec = configs.ClusterSpec.create(name="test", masters=0)
+        errors = validation.validate_template(templates.CMTemplate(spec))
+        self.assertEqual([path for path, _ in errors],
+                         [".data.config.master.instances"])
+
+    def test_metadata(self):
+        """test that label keys and values are checked"""
+        spec = configs.ClusterSpec.create(
+            name="test", labels=["team=a", "bad key=b", "c=some/image"],
+            annotations=["note=some/image"])
+        errors = validation.validate_template(templates.CRDTemplate(spec))
+        self.assertEqual([path for path, _ in errors],
+                         [".metadata.labels.bad key",
+                          ".metadata.labels.c"])
+
+    def test_compiled_once(self):
+        """test that the validator of a kind is compiled only once"""
+        self.assertIs(validation.validator("SparkCluster"),
+                      validation.validator("SparkCluster"))
+        with self.assertRaises(ValueError):
+            validation.validator("Pod")
+
+    def test_schema_types(self):
+        """test the type checks of a compiled schema"""
+        check = validation.compile_schema({
+            "type": "object",
+            "required": ["count"],
+            "additionalProperties": False,
+            "properties": {"count": {"type": "integer"}},
+        })
+        errors = []
+        check({"count": True, "extra": 1}, "", errors)
+        self.assertEqual(len(errors), 2)
+
+    def test_check_all(self):
+        """test that the errors of all definitions are raised together"""
+        definitions = [{"name": "good"}, {"name": "env", "envs": ["A"]},
+                       {"name": "dl", "downloads": ["http://test.test"]}]
+        with self.assertRaises(validation.ValidationError) as raised:
+            validation.check_all(definitions)
+        problems = raised.exception.problems
+        self.assertEqual([label for label, _, _ in problems],
+                         ["cluster env", "cluster dl"])
+        self.assertIn("NAME=VALUE", problems[0][2])
+        self.assertIn("URL::DIR", problems[1][2])
@@ -0,0 +1,70 @@
+import io
+import json
+import unittest
+
+from oshinko_temaki import configs
+from oshinko_temaki import templates
+from oshinko_temaki import writers
+
+
+class TestWriters(unittest.TestCase):
+    documents = ['{"a": 1}', '{"b": 2}']
+
+    def test_yaml_stream(self):
+        """test writing a --- separated yaml stream"""
+        stream = io.StringIO()
+        count = writers.write_documents(self.documents, stream, "yaml")
+        self.assertEqual(count, 2)
+        self.assertEqual(stream.getvalue(),
+                         '---\n{"a": 1}\n---\n{"b": 2}\n')
+
+    def test_ndjson(self):
+        """test writing newline delimited json"""
+        stream = io.StringIO()
+        writers.write_documents(self.documents, stream, "ndjson")
+        observed = [json.loads(line) for line in
+                    stream.getvalue().splitlines()]
+        self.assertEqual(observed, [{"a": 1}, {"b": 2}])
+
+    def test_ndjson_multiline(self):
+        """test that ndjson refuses documents spanning several lines"""
+        with self.assertRaises(ValueError):
+            writers.write_documents(["a: 1\nb: 2\n"], io.StringIO(),
+                                    "ndjson")
+
+    def test_list(self):
+        """test writing a kubernetes List"""
+        stream = io.StringIO()
+        writers.write_documents(self.documents, stream, "list")
+        observed = json.loads(stream.getvalue())
+        self.assertEqual(observed, {"apiVersion": "v1", "kind": "List",
+                                    "items": [{"a": 1}, {"b": 2}]})
+
+    def test_failed_list(self):
+        """test that a List is left unfinished when rendering fails"""
+        def documents():
+            yield self.documents[0]
+            raise ValueError("bad cluster")
+
+        stream = io.StringIO()
+        with self.assertRaises(ValueError):
+            writers.write_documents(documents(), stream, "list")
+        with self.assertRaises(ValueError):
+            json.loads(stream.getvalue())
+
+    def test_empty_list(self):
+        """test that an empty List is still a valid document"""
+        stream = io.StringIO()
+        writers.write_documents([], stream, "list")
+        self.assertEqual(json.loads(stream.getvalue())["items"], [])
+
+    def test_templates(self):
+        """test writing templates from a generator"""
+        stream = io.StringIO()
+        clusters = (templates.CRDTemplate(configs.ClusterConfig(object()))
+                    for _ in range(3))
+        writers.write_documents(clusters, stream, "ndjson")
+        observed = [json.loads(line) for line in
+                    stream.getvalue().splitlines()]
+        self.assertEqual([doc["kind"] for doc in observed],
+                         ["SparkCluster"] * 3)